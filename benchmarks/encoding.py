@@ -0,0 +1,79 @@
+"""
+JSON encoding time per communication tick on every map in maps/, with tanks driving around and bullets
+bouncing: the replay lines of every physics batch, and the client message, which is sent and logged.
+"dumps" encodes each of those separately, "spliced" encodes every updated object once and splices the
+fragments into all of them.
+
+Usage:
+
+python benchmarks/encoding.py [--ticks 30] [--bullets 10] [--seed 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from physics import ROOT, build_world
+
+from config import config  # noqa: E402
+from gameObjects.game_object import GameObject  # noqa: E402
+from replay import ReplayManager  # noqa: E402
+from util import encode_json  # noqa: E402
+
+
+def time_ticks(space, ticks: int, spliced: bool) -> float:
+    replay = ReplayManager("", None, False, replay_format="json")
+    # what ReplayManager does with field deltas, where fragments can't be reused
+    replay._encode_replay = replay._encode_comms = spliced
+    times = []
+    for _ in range(ticks):
+        elapsed = 0.0
+        for _ in range(config.SIMULATION.PHYSICS_ITERATIONS_PER_COMMUNICATION):
+            for _ in range(config.SIMULATION.PYMUNK_TIMESTEP_ITERATIONS):
+                space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+            replay.set_game_info(space)
+            start = time.perf_counter()
+            replay.sync_object_updates_in_replay()
+            elapsed += time.perf_counter() - start
+
+        start = time.perf_counter()
+        message = replay.sync_object_updates_in_comms()
+        for _ in range(2):  # sent, then logged
+            if spliced:
+                encode_json(message)
+            else:
+                json.dumps({"": message}, separators=(",", ":"))
+        elapsed += time.perf_counter() - start
+        replay.buffer = []
+        times.append(elapsed * 1e3)
+    return statistics.mean(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=30, help="communication ticks")
+    parser.add_argument(
+        "--bullets", type=int, default=10, help="bullets fired per tank"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    print(
+        f"{'map':<14}{'dumps':>10}{'spliced':>10}   (ms per communication tick, mean)"
+    )
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        path = os.path.join(map_dir, map_file)
+        row = []
+        for spliced in (False, True):
+            space = build_world(path, args.bullets, args.seed)
+            row.append(time_ticks(space, args.ticks, spliced))
+            GameObject.pop_dirty()
+        print(f"{map_file:<14}{row[0]:>10.2f}{row[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Time the game thread spends logging the world message of each communication tick on every map in
+maps/, with tanks driving around and bullets bouncing. "sync" writes the log file on the game thread,
+"queued" hands records to the background thread of log.py, and "sampled" also only logs every 10th
+message, cut to 1000 characters.
+
+Usage:
+
+python benchmarks/log_latency.py [--ticks 100] [--bullets 10] [--seed 0]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from physics import ROOT, build_world
+
+from config import config  # noqa: E402
+from gameObjects.game_object import GameObject  # noqa: E402
+from log import log_world_message, setup_logging, stop_logging  # noqa: E402
+from replay import ReplayManager  # noqa: E402
+from util import encode_json  # noqa: E402
+
+VARIANTS = {
+    # (BACKGROUND, WORLD_MESSAGE_INTERVAL, MAX_MESSAGE_CHARS)
+    "sync": (False, 1, None),
+    "queued": (True, 1, None),
+    "sampled": (True, 10, 1000),
+}
+
+
+def world_messages(space, ticks: int) -> list[str]:
+    """The world messages of as many communication ticks, as they are logged."""
+    replay = ReplayManager("", None, False, replay_format="json")
+    lines = []
+    for _ in range(ticks):
+        for _ in range(config.SIMULATION.PHYSICS_ITERATIONS_PER_COMMUNICATION):
+            for _ in range(config.SIMULATION.PYMUNK_TIMESTEP_ITERATIONS):
+                space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+            replay.set_game_info(space)
+            replay.sync_object_updates_in_replay()
+        message = replay.sync_object_updates_in_comms()
+        lines.append(f"{{{json.dumps('')}:{encode_json(message)}}}")
+        replay.buffer = []
+    return lines
+
+
+def time_logging(lines: list[str], background: bool, interval: int, limit: int | None):
+    """Returns the mean and 99th percentile microseconds taken to log each line."""
+    config.LOGGING.BACKGROUND = background
+    config.LOGGING.WORLD_MESSAGE_INTERVAL = interval
+    config.LOGGING.MAX_MESSAGE_CHARS = limit
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        setup_logging(os.path.join(directory, "server.log"))
+        try:
+            for number, line in enumerate(lines):
+                start = time.perf_counter()
+                log_world_message(line, number, config.COMMUNICATION.TIMEOUT)
+                times.append((time.perf_counter() - start) * 1e6)
+        finally:
+            stop_logging()
+    return statistics.mean(times), np.percentile(times, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticks", type=int, default=100, help="communication ticks")
+    parser.add_argument(
+        "--bullets", type=int, default=10, help="bullets fired per tank"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    print(
+        f"{'map':<14}"
+        + "".join(f"{v:>18}" for v in VARIANTS)
+        + "   (us per tick, mean / p99)"
+    )
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        space = build_world(os.path.join(map_dir, map_file), args.bullets, args.seed)
+        lines = world_messages(space, args.ticks)
+        GameObject.pop_dirty()
+        row = [time_logging(lines, *variant) for variant in VARIANTS.values()]
+        print(
+            f"{map_file:<14}"
+            + "".join(f"{f'{mean:.1f} / {p99:.1f}':>18}" for mean, p99 in row)
+        )
+
+
+if __name__ == "__main__":
+    main()
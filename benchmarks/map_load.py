@@ -0,0 +1,78 @@
+"""
+Map load time and per-update cost of traversability changes on every map in maps/. "parse" loads
+the ASCII source without the compiled map cache, "cold" misses the cache and writes the map to it
+(as the first game on a map does) and "warm" loads it from the cache (as games in the Docker image,
+where the maps are compiled on build, do).
+
+Usage:
+
+python benchmarks/map_load.py [--repeats 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from config import config  # noqa: E402
+from map import Map  # noqa: E402
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    cache_dir = tempfile.mkdtemp()
+    print(
+        f"{'map':<14}{'parse':>10}{'cold':>10}{'warm':>10}{'wall broken':>14}{'boundary shrink':>18}"
+        "   (ms, mean)"
+    )
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        path = os.path.join(map_dir, map_file)
+        config.MAP.CACHE_DIR = None
+        parse = statistics.mean(timed(lambda: Map(path)) for _ in range(args.repeats))
+        cold = []
+        for _ in range(args.repeats):
+            config.MAP.CACHE_DIR = tempfile.mkdtemp(dir=cache_dir)
+            cold.append(timed(lambda: Map(path)))
+        # the last cold load filled the cache
+        warm = statistics.mean(timed(lambda: Map(path)) for _ in range(args.repeats))
+
+        m = Map(path)
+        walls = [
+            m.to_global_coords(y, x)
+            for y in range(m.map_height)
+            for x in range(m.map_width)
+            if not m.traversability[y, x]
+        ][: args.repeats]
+        wall_broken = (
+            statistics.mean(timed(lambda: m.register_wall_broken(c)) for c in walls)
+            if walls
+            else float("nan")
+        )
+        boundary = statistics.mean(
+            timed(m.update_traversability_boundary)
+            for _ in range(min(args.repeats, min(m.map_width, m.map_height) // 2))
+        )
+        print(
+            f"{map_file:<14}{parse:>10.3f}{statistics.mean(cold):>10.3f}{warm:>10.3f}"
+            f"{wall_broken:>14.4f}{boundary:>18.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
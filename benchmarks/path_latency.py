@@ -0,0 +1,119 @@
+"""
+Per-request path latency on every map in maps/.
+Compares the array-backed JPS engine in Map with the A* finder of the `pathfinding` package
+(installed with requirements/local.txt).
+
+Usage:
+
+python benchmarks/path_latency.py [--requests 200] [--seed 0]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from pathfinding.core.diagonal_movement import DiagonalMovement  # noqa: E402
+from pathfinding.core.grid import Grid  # noqa: E402
+from pathfinding.finder.a_star import AStarFinder  # noqa: E402
+
+from map import Map  # noqa: E402
+
+
+def traversable_cells(m: Map) -> list[tuple[int, int]]:
+    return [
+        (y, x)
+        for y in range(m.map_height)
+        for x in range(m.map_width)
+        if m.traversability[y, x]
+    ]
+
+
+def time_requests(fn, pairs) -> list[float]:
+    timings = []
+    for c1, c2 in pairs:
+        start = time.perf_counter()
+        fn(c1, c2)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarise(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return (
+        f"mean {statistics.mean(timings):8.3f}  p50 {statistics.median(timings):8.3f}  "
+        f"p95 {p95:8.3f}  max {timings[-1]:8.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        m = Map(os.path.join(map_dir, map_file))
+        rng = random.Random(args.seed)
+        cells = traversable_cells(m)
+        pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(args.requests)]
+
+        def library_path(c1, c2, pf_grid=None):
+            pf_grid = pf_grid or Grid(matrix=m.traversability)
+            finder = AStarFinder(
+                diagonal_movement=DiagonalMovement.only_when_no_obstacle
+            )
+            path, _ = finder.find_path(
+                pf_grid.node(c1[1], c1[0]), pf_grid.node(c2[1], c2[0]), pf_grid
+            )
+            pf_grid.cleanup()
+            return path
+
+        persistent_pf_grid = Grid(matrix=m.traversability)
+
+        def uncached_path(c1, c2):
+            m._bump_revision()
+            return m.path(c1, c2)
+
+        print(f"{map_file} ({m.map_width}x{m.map_height}), latency in ms")
+        print(
+            f"  library A*, rebuilt grid     {summarise(time_requests(library_path, pairs))}"
+        )
+        print(
+            "  library A*, persistent grid  "
+            + summarise(
+                time_requests(
+                    lambda a, b: library_path(a, b, persistent_pf_grid), pairs
+                )
+            )
+        )
+        print(
+            f"  array JPS                    {summarise(time_requests(uncached_path, pairs))}"
+        )
+        print(
+            f"  any-angle (path_shortcut)    {summarise(time_requests(m.path_shortcut, pairs))}"
+        )
+        popular_goal = [(c1, pairs[0][1]) for c1, _ in pairs]
+        print(
+            f"  array JPS, popular goal      {summarise(time_requests(uncached_path, popular_goal))}"
+        )
+        m._bump_revision()
+        print(
+            f"  distance field, popular goal {summarise(time_requests(m.path, popular_goal))}"
+        )
+        time_requests(m.path, pairs)  # warm the path cache
+        print(
+            f"  array JPS, repeated request  {summarise(time_requests(m.path, pairs))}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Physics steps per second on every map in maps/, with tanks driving around and bullets bouncing.
+
+Usage:
+
+python benchmarks/physics.py [--steps 3000] [--bullets 10] [--seed 0] [--repeats 3]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import pymunk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from config import config  # noqa: E402
+from gameObjects import Tank  # noqa: E402
+from gameObjects.boundary import Boundary  # noqa: E402
+from map import Map  # noqa: E402
+
+
+def build_world(path: str, bullets: int, seed: int):
+    rng = random.Random(seed)
+    m = Map(path)
+    space = pymunk.Space()
+    objects = list(m.create_game_objects(space))
+    Boundary(
+        space,
+        m.to_global_coords(-0.5, -0.5),
+        m.to_global_coords(m.map_height - 0.5, m.map_width - 0.5),
+    )
+    for tank in (o for o in objects if isinstance(o, Tank)):
+        angle = rng.uniform(0, 2 * math.pi)
+        tank.set_velocity((math.cos(angle), math.sin(angle)))
+        for _ in range(bullets):
+            tank.shoot(rng.uniform(0, 360))
+    return space
+
+
+def steps_per_second(space: pymunk.Space, steps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(steps):
+        space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+    return steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=3000)
+    parser.add_argument(
+        "--bullets", type=int, default=10, help="bullets fired per tank"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeats", type=int, default=3, help="best of this many runs is shown"
+    )
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    print(f"{'map':<14}{'shapes':>8}{'steps/s':>12}")
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        path = os.path.join(map_dir, map_file)
+        rates = []
+        for _ in range(args.repeats):
+            space = build_world(path, args.bullets, args.seed)
+            rates.append(steps_per_second(space, args.steps))
+        print(f"{map_file:<14}{len(space.shapes):>8}{max(rates):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Time to record and diff object state for one replay line on every map in maps/, against wall count.
+"full" marks every object in the space dirty before each sync, which is what recording all of
+space.shapes used to cost. "dirty" only looks at objects marked dirty and those that can move.
+
+Usage:
+
+python benchmarks/replay_sync.py [--syncs 200] [--steps 100] [--bullets 10] [--seed 0]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import numpy as np
+from physics import ROOT, build_world
+
+from config import config  # noqa: E402
+from gameObjects.game_object import GameObject  # noqa: E402
+from map import Map  # noqa: E402
+from replay import ReplayManager  # noqa: E402
+
+
+def time_syncs(space, syncs: int, steps: int, full: bool) -> float:
+    replay = ReplayManager("", "", False)
+    replay.set_game_info(space)
+    replay.sync_object_updates_in_replay()
+    times = []
+    for _ in range(syncs):
+        for _ in range(steps):
+            space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+        if full:
+            for shape in space.shapes:
+                if hasattr(shape, "_gameobject"):
+                    shape._gameobject.mark_dirty()
+        start = time.perf_counter()
+        replay.set_game_info(space)
+        replay.sync_object_updates_in_replay()
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.mean(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--syncs", type=int, default=200)
+    parser.add_argument(
+        "--steps", type=int, default=100, help="physics steps between syncs"
+    )
+    parser.add_argument(
+        "--bullets", type=int, default=10, help="bullets fired per tank"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    map_dir = os.path.join(ROOT, "maps")
+    print(f"{'map':<14}{'walls':>8}{'full':>10}{'dirty':>10}   (us per sync, mean)")
+    for map_file in sorted(os.listdir(map_dir)):
+        if not map_file.endswith(".map"):
+            continue
+        path = os.path.join(map_dir, map_file)
+        row = []
+        for full in (True, False):
+            space = build_world(path, args.bullets, args.seed)
+            row.append(time_syncs(space, args.syncs, args.steps, full))
+            GameObject.pop_dirty()
+        walls = int(np.isin(Map(path).characters, list(b"XD")).sum())
+        print(f"{map_file:<14}{walls:>8}{row[0]:>10.1f}{row[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
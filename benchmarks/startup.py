@@ -0,0 +1,89 @@
+"""
+Time to first tick on every map in maps/: loading the map, building the game, sending the initial
+world to the clients and simulating the first step. Clients are simulated, and what the server
+prints is counted instead of being sent anywhere.
+The initial world is sent in messages of COMMUNICATION.INIT_CHUNK_BYTES. "paused" pauses for 0.1s
+after each message, as the server used to, "chunked" doesn't pause and "compact" also sends the
+indestructible walls as one grid.
+
+Usage:
+
+python benchmarks/startup.py [--repeats 3]
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import time
+
+import pymunk
+from physics import ROOT
+
+from config import config  # noqa: E402
+from game import Game  # noqa: E402
+from map import Map  # noqa: E402
+from replay import ReplayManager  # noqa: E402
+
+CLIENTS = json.dumps({"clients": [{"id": "a", "name": "A"}, {"id": "b", "name": "B"}]})
+
+VARIANTS = {
+    # (INIT_SLEEP, COMPACT_STATIC_WORLD)
+    "paused": (0.1, False),
+    "chunked": (0, False),
+    "compact": (0, True),
+}
+
+
+def time_to_first_tick(path: str, sleep: float, compact: bool):
+    """Returns the seconds until the first tick, the number of messages printed and their size."""
+    config.COMMUNICATION.INIT_SLEEP = sleep
+    config.COMMUNICATION.COMPACT_STATIC_WORLD = compact
+    builtins.input = lambda *args: CLIENTS
+    out = io.StringIO()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        space = pymunk.Space()
+        game = Game(space, Map(path), ReplayManager("", None, False), seed=0)
+        space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+        game.tick()
+    elapsed = time.perf_counter() - start
+
+    game.close()
+    messages = [line for line in out.getvalue().splitlines() if line.startswith("{")]
+    return elapsed, len(messages), sum(len(m) for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--repeats", type=int, default=3, help="best of this many runs is shown"
+    )
+    args = parser.parse_args()
+
+    input_ = builtins.input
+    map_dir = os.path.join(ROOT, "maps")
+    print(
+        f"{'map':<14}"
+        + "".join(f"{v:>26}" for v in VARIANTS)
+        + "   (s / messages / KB)"
+    )
+    try:
+        for map_file in sorted(os.listdir(map_dir)):
+            if not map_file.endswith(".map"):
+                continue
+            path = os.path.join(map_dir, map_file)
+            row = []
+            for variant in VARIANTS.values():
+                runs = [time_to_first_tick(path, *variant) for _ in range(args.repeats)]
+                elapsed, messages, size = min(runs)
+                row.append(f"{elapsed:.3f} / {messages} / {size / 1024:.1f}")
+            print(f"{map_file:<14}" + "".join(f"{cell:>26}" for cell in row))
+    finally:
+        builtins.input = input_
+
+
+if __name__ == "__main__":
+    main()
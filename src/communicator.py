@@ -1,53 +1,91 @@
+from __future__ import annotations
+
 import json
 import logging
+import sys
+import time
+from collections import Counter, defaultdict
 from time import sleep
 
+import numpy as np
+
 from config import config
+from input_log import InputLog
+from log import log_world_message
+from util import encode_json
 
 
 class Communicator:
-    def __init__(self):
+    def __init__(self, input_log: InputLog | None = None):
         self.timeout = config.COMMUNICATION.TIMEOUT
+        # With early advance, a tick lasts at least MIN_TIMEOUT and at most MAX_TIMEOUT,
+        # and ends as soon as every client has answered in between
+        self.min_timeout = 0
+        if config.COMMUNICATION.EARLY_ADVANCE:
+            self.timeout = config.COMMUNICATION.MAX_TIMEOUT
+            self.min_timeout = config.COMMUNICATION.MIN_TIMEOUT
+        # Seconds taken to answer each message, and the number of messages not answered in time, by client
+        self.response_times: defaultdict[str, list[float]] = defaultdict(list)
+        self.missed_responses: Counter[str] = Counter()
+        self._sent_at: float | None = None
+        # World messages posted so far, which decides which of them are logged
+        self.messages_posted = 0
+        # Every message received is recorded in the input log, so the game can be re-simulated
+        self.input_log = input_log
         self.client_info = self.get_message()["clients"]
 
+        if len(self.client_info) != 2:
+            # every map spawns two tanks, and each client is told the id of its one enemy
+            raise ValueError(
+                f"A game is played by 2 clients, but {len(self.client_info)} joined"
+            )
         for client in self.client_info:
             client["id"] = str(client["id"])
 
         self.post_client_ids()
 
+    def client_ids(self) -> dict:
+        """The ids of its own tank and the enemy's, by client."""
+        return {
+            self.client_info[0]["id"]: {
+                "your-tank-id": f"tank-{self.client_info[0]['id']}",
+                "enemy-tank-id": f"tank-{self.client_info[1]['id']}",
+            },
+            self.client_info[1]["id"]: {
+                "your-tank-id": f"tank-{self.client_info[1]['id']}",
+                "enemy-tank-id": f"tank-{self.client_info[0]['id']}",
+            },
+        }
+
     def post_client_ids(self):
-        print(
-            json.dumps(
-                {
-                    self.client_info[0]["id"]: {
-                        "your-tank-id": f"tank-{self.client_info[0]['id']}",
-                        "enemy-tank-id": f"tank-{self.client_info[1]['id']}",
-                    },
-                    self.client_info[1]["id"]: {
-                        "your-tank-id": f"tank-{self.client_info[1]['id']}",
-                        "enemy-tank-id": f"tank-{self.client_info[0]['id']}",
-                    },
-                },
-                separators=(",", ":"),
-            ),
-            flush=True,
-        )
-        print(0.1, flush=True)
-        sleep(0.1)
+        print(json.dumps(self.client_ids(), separators=(",", ":")), flush=True)
+        print(config.COMMUNICATION.INIT_TIMEOUT, flush=True)
+        self._init_sleep()
+
+    def _init_sleep(self):
+        if config.COMMUNICATION.INIT_SLEEP > 0:
+            sleep(config.COMMUNICATION.INIT_SLEEP)
 
     def post_init_world_message(self, message):
         """
         Prints an init world message - refer to the GCS docs.
-        These messages are sent to all clients.
+        These messages are sent to all clients, split into messages of about INIT_CHUNK_BYTES each.
         """
-        object_info = message["updated_objects"]
+        budget = config.COMMUNICATION.INIT_CHUNK_BYTES
         current_message = {"deleted_objects": [], "updated_objects": {}}
+        current_size = 0
 
-        for key, value in object_info.items():
-            if len(current_message["updated_objects"]) == 100:
+        for key, value in message["updated_objects"].items():
+            # the size this object adds to the message, as "key":value,
+            size = (
+                len(json.dumps(key)) + len(json.dumps(value, separators=(",", ":"))) + 2
+            )
+            if current_message["updated_objects"] and current_size + size > budget:
                 self.post_message_with_delay(current_message)
                 current_message = {"deleted_objects": [], "updated_objects": {}}
+                current_size = 0
             current_message["updated_objects"][key] = value
+            current_size += size
 
         if len(current_message["updated_objects"]) > 0:
             self.post_message_with_delay(current_message)
@@ -57,15 +95,16 @@ class Communicator:
         message: str,
     ):
         json_message = json.dumps({"": message}, separators=(",", ":"))
+        timeout = config.COMMUNICATION.INIT_TIMEOUT
         print(json_message, flush=True)
-        print(0.1, flush=True)  # GCS expects timeout time for all messages
-        sleep(0.1)
+        print(timeout, flush=True)  # GCS expects timeout time for all messages
+        self._init_sleep()
         logging.info(json_message)
-        logging.info(0.1)
+        logging.info(timeout)
 
     def terminate_init_world_sequence(self):
         print('"END_INIT"', flush=True)
-        sleep(0.1)
+        self._init_sleep()
         logging.info('"END_INIT"')
 
     def post_message(
@@ -73,15 +112,67 @@ class Communicator:
         message: str,
         client_id: str = "",
     ):
-        print(json.dumps({client_id: message}, separators=(",", ":")), flush=True)
-        print(self.timeout, flush=True)
+        # the message is encoded once, and the same text is sent and logged
+        line = f"{{{json.dumps(client_id)}:{encode_json(message)}}}"
+        self._write(f"{line}\n{self.timeout}\n")
+        self._sent_at = time.perf_counter()
+
+        log_world_message(line, self.messages_posted, self.timeout)
+        self.messages_posted += 1
 
-        logging.info(json.dumps({client_id: message}, separators=(",", ":")))
-        logging.info(self.timeout)
+    @staticmethod
+    def _write(text: str):
+        """Writes text to stdout as bytes in one go, skipping the text layer when there is one."""
+        stdout = sys.stdout
+        buffer = getattr(stdout, "buffer", None)
+        if buffer is None:
+            stdout.write(text)
+            stdout.flush()
+            return
+        buffer.write(text.encode())
+        buffer.flush()
 
     def get_message(self):
-        return json.loads(input())
+        line = input()
+        if self._sent_at is not None:
+            # the coordinator answers for every client at once, so only the round trip can be timed
+            elapsed = time.perf_counter() - self._sent_at
+            self._sent_at = None
+            self.response_times["round_trip"].append(elapsed)
+            if elapsed < self.min_timeout:
+                sleep(self.min_timeout - elapsed)
+        if self.input_log is not None:
+            self.input_log.record(line)
+        return json.loads(line)
 
     def terminate_game(self):
         print('"END"', flush=True)
         logging.info('"END"')
+
+    def response_time_stats(self) -> dict[str, dict]:
+        """Percentiles of the response times in milliseconds, and the responses missed, by client."""
+        stats = {}
+        for client_id in dict.fromkeys([*self.response_times, *self.missed_responses]):
+            times = np.array(self.response_times[client_id]) * 1000
+            stats[client_id] = {
+                "responses": len(times),
+                "missed": self.missed_responses[client_id],
+            }
+            if len(times):
+                p50, p90, p99, maximum = (
+                    np.percentile(times, [50, 90, 99, 100]).round(2).tolist()
+                )
+                stats[client_id].update(p50=p50, p90=p90, p99=p99, max=maximum)
+        return stats
+
+    def close(self):
+        """Releases the connection to the clients once the game is over."""
+
+
+def create_communicator(input_log: InputLog | None = None) -> Communicator:
+    """The communicator for COMMUNICATION.TRANSPORT."""
+    if config.COMMUNICATION.TRANSPORT == "stdio":
+        return Communicator(input_log)
+    from socket_communicator import SocketCommunicator
+
+    return SocketCommunicator(input_log)
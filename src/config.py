@@ -32,7 +32,7 @@ defaults = {
         "RADIUS": 0.1,
         "ELASTICITY": 1,
     },
-    "MAP": {"NUKETOWN": "nuketown.map", "DIR": "maps/"},
+    "MAP": {"NUKETOWN": "nuketown.map", "DIR": "maps/", "CACHE_DIR": "maps/.cache/"},
     "COLLISION_TYPE": {
         "TANK": 1,
         "BULLET": 2,
@@ -80,12 +80,67 @@ defaults = {
         "PHYSICS_ITERATIONS_PER_COMMUNICATION": 15,
         "PYGAME_FPS": 60,
         "PYMUNK_TIMESTEP_ITERATIONS": 100,
+        # Seed of the game's random numbers (powerup spawns). None picks a new one every game.
+        "SEED": None,
     },
     "REPLAY": {
         "PATH": "replay/replay",
         "LIVE_PATH": "live-replay/replay",
+        # Only write the fields of an object that changed since its last update
+        "FIELD_DELTAS": False,
+        # "json" for JSON lines, "binary" for the compact format of replay_binary.py
+        "FORMAT": "json",
+        # Tick records between full-state keyframes in binary replays
+        "KEYFRAME_INTERVAL": 150,
+        # Tick records between the full-state snapshots used to seek in replays
+        "SNAPSHOT_INTERVAL": 150,
+        # Compress finished segments with "zlib" or "lzma" (adding .zlib or .xz to their names), or None
+        "COMPRESSION": None,
+        # Write replay files on a background thread instead of the game loop
+        "BACKGROUND_WRITER": True,
+        # Where the input log, which resimulate.py regenerates the replay from, is written. None to not write it.
+        "INPUT_LOG_PATH": "replay/replay-inputs.jsonl",
+    },
+    "LOGGING": {
+        "PATH": "replay/server.log",
+        "LEVEL": "INFO",
+        # Write the log on a background thread, so the game thread only queues records
+        "BACKGROUND": True,
+        # Log every n-th world message sent to the clients (0 to log none of them)
+        "WORLD_MESSAGE_INTERVAL": 1,
+        # Cut logged world messages to this many characters, or None to log them whole
+        "MAX_MESSAGE_CHARS": None,
+    },
+    "COMMUNICATION": {
+        # "stdio" talks to a coordinator over stdin/stdout, "tcp" and "unix" serve the clients directly
+        # (see socket_communicator.py)
+        "TRANSPORT": "stdio",
+        "HOST": "127.0.0.1",
+        "PORT": 7423,
+        "SOCKET_PATH": "replay/server.sock",
+        # Clients the socket transports wait for before starting the game. Games are played by 2.
+        "CLIENTS": 2,
+        # Seconds a client has to send its info after connecting, and the socket transports wait for
+        # every client to join before giving up on the game (None waits forever)
+        "HANDSHAKE_TIMEOUT": 5,
+        "JOIN_TIMEOUT": 60,
+        "TIMEOUT": 0.1,
+        # Move on to the next tick as soon as every client has answered, but wait at least MIN_TIMEOUT
+        # and at most MAX_TIMEOUT (which is the timeout sent to the coordinator) instead of TIMEOUT
+        "EARLY_ADVANCE": False,
+        "MIN_TIMEOUT": 0.02,
+        "MAX_TIMEOUT": 0.2,
+        # Timeout sent after each message before the game starts, which clients don't answer
+        "INIT_TIMEOUT": 0.1,
+        # Seconds to pause after each message before the game starts. The timeouts already pace the clients.
+        "INIT_SLEEP": 0,
+        # Objects in the initial world are sent in messages of about this many bytes
+        "INIT_CHUNK_BYTES": 16384,
+        # Send indestructible walls as one grid of the map instead of an object each
+        "COMPACT_STATIC_WORLD": False,
+        # Only send clients the fields of an object that changed since its last update
+        "FIELD_DELTAS": False,
     },
-    "COMMUNICATION": {"TIMEOUT": 0.1},
     "POWERUP": {
         "RADIUS": 15,
         "COLOR": (255, 165, 255, 0),
@@ -97,5 +152,14 @@ defaults = {
         "SPEED_BOOST": 2,
     },
     "TICKS_PER_POWERUP": 25000,
+    "PATHFINDING": {
+        "CACHE_SIZE": 256,
+        "DISTANCE_FIELD_CACHE_SIZE": 8,
+        "DISTANCE_FIELD_MIN_REQUESTS": 3,
+        # Limits on a single search (jump points expanded / seconds), which also cap the cells of a distance
+        # field worked out per request. None for no limit.
+        "NODE_BUDGET": 500,
+        "TIME_BUDGET": None,
+    },
 }
 config = get_config()
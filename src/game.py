@@ -1,38 +1,75 @@
 from __future__ import annotations
 
 import logging
+import os
 import random
 from collections import defaultdict
 from collections.abc import Callable
 
 import pymunk
 
-from communicator import Communicator
+from communicator import Communicator, create_communicator
 from config import config
 from gameObjects.boundary import Boundary
 from gameObjects.bullet import Bullet
+from gameObjects.game_object import GameObject
 from gameObjects.powerup import Powerup, PowerupType
 from gameObjects.tank import Tank
 from gameObjects.wall import Wall
+from input_log import InputLog
 from log import log_with_time
 from map import Map
 from player import Player
 from replay import ReplayManager
+from scheduler import Scheduler
 
 
 class Game:
-    def __init__(self, space: pymunk.Space, map: Map, replay_manager: ReplayManager):
+    def __init__(
+        self,
+        space: pymunk.Space,
+        map: Map,
+        replay_manager: ReplayManager,
+        comms: Communicator | None = None,
+        seed: int | None = None,
+        input_log: InputLog | None = None,
+    ):
+        """
+        comms defaults to the transport set in COMMUNICATION.TRANSPORT.
+        seed defaults to SIMULATION.SEED, or a random one if that is None.
+        The same seed and client messages always play out the same game.
+        """
+        # Marks left by an earlier game in this process would otherwise be synced into this one's replay
+        GameObject.pop_dirty()
         self.space = space
         self.map = map
         self.game_objects = list(self.map.create_game_objects(self.space))
         self.replay_manager = replay_manager
 
-        self.comms = Communicator()
+        self.tick_count = 0
+        self.scheduler = Scheduler()
+
+        if seed is None:
+            seed = config.SIMULATION.SEED
+        if seed is None:
+            seed = random.SystemRandom().randrange(2**32)
+        self.seed = seed
+        # All randomness in the game comes from here, so that it can be re-simulated
+        self.random = random.Random(seed)
+
+        if input_log is not None:
+            input_log.write_header(os.path.basename(map.map_name), map.source, seed)
+        self.comms = comms if comms is not None else create_communicator(input_log)
         tanks = filter(lambda go: isinstance(go, Tank), self.game_objects)
         self.players = {
-            client_info["id"]: Player(tank, map, client_info)
+            client_info["id"]: Player(tank, map, client_info, self.scheduler)
             for tank, client_info in zip(tanks, self.comms.client_info)
         }
+        self._players_by_tank = {
+            player.gameobject: player for player in self.players.values()
+        }
+        # Players whose tank was knocked off course by a collision during the last step
+        self._disturbed_players: dict[Player, None] = {}
         self.path_indicators = {
             client_info["id"]: [] for client_info in self.comms.client_info
         }
@@ -56,7 +93,10 @@ class Game:
         self.game_objects.append(self.boundary)
         self.game_objects.append(self.closing_boundary)
 
-        self.tick_count = 0
+        self._schedule_events()
+        # The game is over once at most one tank is left, which can only change when a tank takes damage.
+        # Start set in case there are fewer than two players.
+        self.tank_hp_changed = True
 
         self.add_collision_handlers()
         self.add_separate_handlers()
@@ -68,9 +108,44 @@ class Game:
         log_with_time("Sending map info to clients")
         self.replay_manager.set_game_info(self.space)
         comms_line = self.replay_manager.sync_object_updates_in_comms()
+        if config.COMMUNICATION.COMPACT_STATIC_WORLD:
+            comms_line = self._post_static_world(comms_line)
         self.comms.post_init_world_message(comms_line)
         self.comms.terminate_init_world_sequence()
 
+    def _post_static_world(self, comms_line: dict) -> dict:
+        """
+        Sends the indestructible walls as a single grid of the map, and returns comms_line without them.
+        Row 0 is the top of the map, and cell (row, column) is centred on
+        ((column + 0.5) * cell_size, (height - row - 0.5) * cell_size), like the map file.
+        """
+        rows = [
+            bytearray(b"." * self.map.map_width) for _ in range(self.map.map_height)
+        ]
+        objects = {}
+        for object_id, object_data in comms_line["updated_objects"].items():
+            if (
+                object_data.get("type") == config.COLLISION_TYPE.WALL
+                and "hp" not in object_data
+            ):
+                y, x = self.map.from_global_coords(*object_data["position"])
+                rows[y][x] = ord("X")
+            else:
+                objects[object_id] = object_data
+        if len(objects) == len(comms_line["updated_objects"]):
+            return comms_line
+
+        self.comms.post_message_with_delay(
+            {
+                "static_world": {
+                    "type": config.COLLISION_TYPE.WALL,
+                    "cell_size": config.GRID_SCALING,
+                    "walls": [row.decode() for row in rows],
+                }
+            }
+        )
+        return {**comms_line, "updated_objects": objects}
+
     def add_separate_handlers(self):
         collision_groups: list[tuple[int, int, Callable | None]] = [
             (
@@ -150,9 +225,25 @@ class Game:
 
         for coltype_a, coltype_b, handler in collision_groups:
             collision_handler = self.space.add_collision_handler(coltype_a, coltype_b)
+            if config.COLLISION_TYPE.TANK in (coltype_a, coltype_b):
+                handler = self._tank_collision_handler(handler)
             if handler:
                 collision_handler.post_solve = handler
 
+    def _tank_collision_handler(self, handler: Callable | None) -> Callable:
+        """Wraps a post_solve handler so that the players whose tanks collided re-plan their movement."""
+
+        def post_solve(arbiter: pymunk.Arbiter, space: pymunk.Space, data):
+            for shape in arbiter.shapes:
+                if shape._gameobject in self._players_by_tank:
+                    self._disturbed_players[
+                        self._players_by_tank[shape._gameobject]
+                    ] = None
+            if handler:
+                handler(arbiter, space, data)
+
+        return post_solve
+
     def remove_collision_handlers(self):
         collision_groups: list[tuple[int, int]] = [
             (config.COLLISION_TYPE.BULLET, config.COLLISION_TYPE.POWERUP),
@@ -213,8 +304,8 @@ class Game:
             data (_type_): pymunk provided arg
         """
         for shape in arbiter.shapes:
-            if shape._gameobject.apply_damage(
-                config.CLOSING_BOUNDARY.DAMAGE
+            if self._apply_damage(
+                shape._gameobject, config.CLOSING_BOUNDARY.DAMAGE
             ).is_destroyed():
                 space.remove(shape, shape.body)
                 self.game_objects.remove(
@@ -240,7 +331,7 @@ class Game:
                 damage = shape._gameobject.damage
 
         for shape in arbiter.shapes:
-            if shape._gameobject.apply_damage(damage).is_destroyed() or (
+            if self._apply_damage(shape._gameobject, damage).is_destroyed() or (
                 not bouncy and isinstance(shape._gameobject, Bullet)
             ):
                 if shape.collision_type == config.COLLISION_TYPE.DESTRUCTIBLE_WALL:
@@ -277,6 +368,7 @@ class Game:
                     shape.collision_type = config.COLLISION_TYPE.PATH
                     self.path_indicators[client_id].append((body, shape))
                     self.space.add(body, shape)
+                self.replay_manager.path_indicators_changed = True
             elif (
                 message[client_id] is not None
                 and "path" not in message[client_id]
@@ -284,28 +376,53 @@ class Game:
             ):
                 self.remove_path_indicators(client_id)
 
+    def close(self):
+        """Releases resources held by the game once it is over."""
+        self.comms.close()
+        # the marks hold on to this game's objects
+        GameObject.pop_dirty()
+
     def remove_path_indicators(self, client_id):
         for b, s in self.path_indicators[client_id]:
             self.space.remove(b, s)
         self.path_indicators[client_id] = []
+        self.replay_manager.path_indicators_changed = True
 
     def tick(self):
         """called at every tick"""
         self.tick_count += 1
+        self.scheduler.advance()
         self._play_turn()
-        if self.tick_count % config.TICKS_PER_POWERUP == 0:
-            self.spawn_powerup()
-        if (
-            self.tick_count
-            % (6000 * (config.GRID_SCALING / config.CLOSING_BOUNDARY.VELOCITY))
-            == 0
-        ):
-            self.map.update_traversability_boundary()
-        if self._is_terminal():
-            self.comms.terminate_game()
-            return True
+        if self.tank_hp_changed:
+            self.tank_hp_changed = False
+            if self._is_terminal():
+                self.comms.terminate_game()
+                return True
         return False
 
+    def _schedule_events(self):
+        # at equal ticks, powerups spawn before the boundary shrinks
+        self.scheduler.schedule(
+            config.TICKS_PER_POWERUP,
+            self.spawn_powerup,
+            interval=config.TICKS_PER_POWERUP,
+            priority=0,
+        )
+        ticks_per_boundary_shrink = 6000 * (
+            config.GRID_SCALING / config.CLOSING_BOUNDARY.VELOCITY
+        )
+        self.scheduler.schedule(
+            ticks_per_boundary_shrink,
+            self.map.update_traversability_boundary,
+            interval=ticks_per_boundary_shrink,
+            priority=1,
+        )
+
+    def _apply_damage(self, game_object: GameObject, damage) -> GameObject:
+        if isinstance(game_object, Tank):
+            self.tank_hp_changed = True
+        return game_object.apply_damage(damage)
+
     def spawn_powerup(self) -> Powerup:
         boundary_vertices = self.closing_boundary.get_vertices()
         xrange = (
@@ -319,8 +436,8 @@ class Game:
 
         for _ in range(15):  # 15 retries to find position to plant powerup
             collision_detected = False
-            poweup_coord = (random.randint(*xrange), random.randint(*yrange))
-            powerup_type = random.choice(list(PowerupType))
+            poweup_coord = (self.random.randint(*xrange), self.random.randint(*yrange))
+            powerup_type = self.random.choice(list(PowerupType))
 
             powerup = Powerup(
                 space=self.space,
@@ -328,9 +445,10 @@ class Game:
                 powerup_type=powerup_type,
             )
             for object in self.game_objects:
-                if (isinstance(object, Wall) or isinstance(object, Tank)) and len(
-                    object.shape.shapes_collide(powerup.shape).points
-                ) > 0:
+                if (
+                    isinstance(object, (Wall, Tank))
+                    and len(object.shape.shapes_collide(powerup.shape).points) > 0
+                ):
                     collision_detected = True
                     self.space.remove(powerup.shape, powerup.body)
                     del powerup
@@ -340,8 +458,9 @@ class Game:
                 return powerup
 
     def _play_turn(self) -> None:
-        for player in self.players.values():
-            player.tick()
+        while self._disturbed_players:
+            player, _ = self._disturbed_players.popitem()
+            player.follow_path()
 
     def _is_terminal(self) -> bool:
         active_players = 0
@@ -63,6 +63,9 @@ class Boundary(GameObject):
             self.shape[i] = shape
             space.add(self.body[i], shape)
 
+    def is_in(self, space: pymunk.Space) -> bool:
+        return self.body[0].space is space
+
     def get_vertices(self):
         pos = [
             [x.position[0] + self.verts[i][0], x.position[1] + self.verts[i][1]]
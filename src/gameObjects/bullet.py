@@ -8,6 +8,8 @@ from util import round_vec2d
 
 
 class Bullet(GameObject):
+    columnar_state = True
+
     def __init__(
         self,
         space: pymunk.Space,
@@ -36,10 +38,16 @@ class Bullet(GameObject):
         self.tank_id = tank_id
 
     def info(self):
+        return self.state_info(
+            round_vec2d(self.body.position), round_vec2d(self.body.velocity)
+        )
+
+    def state_info(self, position: list[float], velocity: list[float]):
+        """info() given the rounded position and velocity of the body."""
         return {
             "type": self.shape.collision_type,  # this is to let the clients know what type of object this is
             "tank_id": self.tank_id,
-            "position": round_vec2d(self.body.position),
-            "velocity": round_vec2d(self.body.velocity),
+            "position": position,
+            "velocity": velocity,
             "damage": self.damage,
         }
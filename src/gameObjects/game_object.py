@@ -17,6 +17,14 @@ class IDCounter:
 
 
 class GameObject:
+    # Objects whose info() may have changed since the replay last looked at them, in the order they changed.
+    # Objects that can move are always looked at, so only changes to static objects need to be marked.
+    # Shared by the process, so Game clears it when a game starts and once it is over.
+    _dirty: dict[GameObject, None] = {}
+    # Whether info() only changes with the body's position and velocity, hp, or fields that mark the object dirty.
+    # The replay then tracks such objects in a StateTable, and builds their info with state_info().
+    columnar_state = False
+
     def __init__(
         self,
         space: pymunk.Space,
@@ -37,6 +45,28 @@ class GameObject:
         # Should not use but here for demonstrative purposes.
         self.id = f"BLANK-{IDCounter.get_id('blank')}"
 
+    @property
+    def hp(self):
+        return self._hp
+
+    @hp.setter
+    def hp(self, hp):
+        self._hp = hp
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        GameObject._dirty[self] = None
+
+    @classmethod
+    def pop_dirty(cls) -> list[GameObject]:
+        """Returns the objects marked dirty since the last call, and clears the marks."""
+        dirty = list(cls._dirty)
+        cls._dirty.clear()
+        return dirty
+
+    def is_in(self, space: pymunk.Space) -> bool:
+        return self.body.space is space
+
     def is_static(self):
         return self.body_type == pymunk.Body.STATIC
 
@@ -12,6 +12,8 @@ from util import round_vec2d
 
 
 class Tank(GameObject):
+    columnar_state = True
+
     def __init__(self, space: pymunk.Space, coord: tuple[int, int]):
 
         super().__init__(space=space, coord=coord)
@@ -105,10 +107,16 @@ class Tank(GameObject):
         return sqrt((self.dims[0] / 2) ** 2 + (self.dims[1] / 2) ** 2)
 
     def info(self):
+        return self.state_info(
+            round_vec2d(self.body.position), round_vec2d(self.body.velocity)
+        )
+
+    def state_info(self, position: list[float], velocity: list[float]):
+        """info() given the rounded position and velocity of the body."""
         return {
             "type": self.shape.collision_type,  # this is to let the clients know what type of object this is
-            "position": round_vec2d(self.body.position),
-            "velocity": round_vec2d(self.body.velocity),
+            "position": position,
+            "velocity": velocity,
             "hp": "inf" if self.hp == float("inf") else self.hp,
             "powerups": self.powerups,
         }
@@ -117,8 +125,14 @@ class Tank(GameObject):
         if powerup.powerup_type == PowerupType.HEALTH:
             self.hp += config.POWERUP.HP_BOOST
         elif powerup.powerup_type == PowerupType.SPEED:
-            self.powerups = list(set(self.powerups + [powerup.powerup_type]))
+            self._add_powerup(powerup.powerup_type)
             self.velocity_mult = config.POWERUP.SPEED_BOOST
         elif powerup.powerup_type == PowerupType.DAMAGE:
-            self.powerups = list(set(self.powerups + [powerup.powerup_type]))
+            self._add_powerup(powerup.powerup_type)
             self.bullet_damage = config.POWERUP.BULLET_BOOST
+
+    def _add_powerup(self, powerup_type: PowerupType):
+        # kept in the order they were picked up, so replays do not depend on set ordering
+        if powerup_type not in self.powerups:
+            self.powerups = self.powerups + [powerup_type]
+            self.mark_dirty()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+
+
+class InputLog:
+    """
+    Records everything a game needs to be re-simulated (see resimulate.py): the map, the random seed
+    and every message received from the clients, as received. This is a tiny fraction of the size of
+    the replay, which can then be regenerated on demand.
+
+    The log is a JSON lines file. The first line holds the map and seed, and every line after it is
+    one raw client message, the first being the client info.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w")
+
+    def write_header(self, map_name: str, source: str, seed: int):
+        self._write({"map_name": map_name, "map": source.splitlines(), "seed": seed})
+
+    def record(self, line: str):
+        """Records the raw text of a message received from the clients."""
+        self._file.write(line.rstrip("\n") + "\n")
+
+    def _write(self, obj: dict):
+        self._file.write(json.dumps(obj, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def read_input_log(path: str) -> tuple[dict, list[str]]:
+    """Returns the header and the raw client messages of an input log."""
+    with open(path) as f:
+        header = json.loads(f.readline())
+        messages = [line.rstrip("\n") for line in f]
+    return header, messages
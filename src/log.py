@@ -1,6 +1,95 @@
+from __future__ import annotations
+
 import logging
-from datetime import datetime
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from config import config
+
+_listener: QueueListener | None = None
+_handlers: list[logging.Handler] = []
+
+# The formatted time of the last second something was logged in
+_stamp_second = -1
+_stamp = ""
+
+
+class _PassThroughQueueHandler(QueueHandler):
+    """
+    Queues records of plain strings as they are, so even formatting them happens on the listener's thread.
+    Any other message (e.g. a list, or one with arguments) could change before the listener formats it,
+    so those are formatted here first.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args or not isinstance(record.msg, str):
+            return super().prepare(record)
+        return record
+
+
+def setup_logging(path: str | None = None):
+    """
+    Logs to config.LOGGING.PATH (or path) at config.LOGGING.LEVEL. With LOGGING.BACKGROUND, the game
+    thread only puts records on a queue, and a background thread writes them to the file.
+    """
+    global _listener
+    handler = logging.FileHandler(path or config.LOGGING.PATH, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root = logging.getLogger()
+    root.setLevel(config.LOGGING.LEVEL)
+
+    if config.LOGGING.BACKGROUND:
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = QueueListener(records, handler)
+        _listener.start()
+        _handlers.append(_PassThroughQueueHandler(records))
+    _handlers.append(handler)
+    root.addHandler(_handlers[0])
+
+
+def stop_logging():
+    """Writes out every queued record and closes the log file."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    root = logging.getLogger()
+    for handler in _handlers:
+        root.removeHandler(handler)
+        handler.close()
+    _handlers.clear()
+
+
+def _timestamp() -> str:
+    # formatted at most once a second, as the time is only logged to the second
+    global _stamp_second, _stamp
+    second = int(time.time())
+    if second != _stamp_second:
+        _stamp_second = second
+        _stamp = time.strftime("%H:%M:%S", time.localtime(second))
+    return _stamp
 
 
 def log_with_time(message: str):
-    logging.info(f"[{datetime.now().strftime('%H:%M:%S')}] - {message}")
+    logging.info(f"[{_timestamp()}] - {message}")
+
+
+def log_world_message(line: str, number: int, timeout: float | None = None):
+    """
+    Logs the world message of a communication tick, and the timeout sent with it. Only every
+    LOGGING.WORLD_MESSAGE_INTERVAL-th message is logged, cut to LOGGING.MAX_MESSAGE_CHARS.
+    """
+    interval = config.LOGGING.WORLD_MESSAGE_INTERVAL
+    if (
+        not interval
+        or number % interval
+        or not logging.getLogger().isEnabledFor(logging.INFO)
+    ):
+        return
+    limit = config.LOGGING.MAX_MESSAGE_CHARS
+    if limit is not None and len(line) > limit:
+        line = f"{line[:limit]}... ({len(line) - limit} more characters)"
+    logging.info(line)
+    if timeout is not None:
+        logging.info(timeout)
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import argparse
 import json
 import logging
@@ -6,27 +8,38 @@ import sys
 
 import pymunk
 
+from communicator import Communicator
 from config import config
 from game import Game
-from log import log_with_time
+from input_log import InputLog
+from log import log_with_time, setup_logging, stop_logging
 from map import Map
 from replay import ReplayManager
 
 
-def run(replay: ReplayManager, map_name, use_pygame=False):
+def run(
+    replay: ReplayManager,
+    map_name,
+    use_pygame=False,
+    comms: Communicator | None = None,
+    seed: int | None = None,
+    input_log: InputLog | None = None,
+    results_path: str = "replay/results.json",
+):
     log_with_time("Creating the map and pymunk space")
     m = Map(map_name=map_name)
     running = True
     space = pymunk.Space()
 
     log_with_time("Creating the game object")
-    game = Game(space, m, replay)
+    game = Game(space, m, replay, comms=comms, seed=seed, input_log=input_log)
 
     log_with_time("Printing map content in replay file")
-    with open(map_name) as mapFile:
-        replay.post_custom_replay_line({"map": mapFile.read().splitlines()})
+    replay.post_custom_replay_line({"map": m.source.splitlines()})
     log_with_time("Printing client info in replay file")
     replay.post_custom_replay_line({"client_info": game.comms.client_info})
+    if replay.replay_field_deltas:
+        replay.post_custom_replay_line({"encoding": "field_deltas"})
 
     if use_pygame:
         import pygame
@@ -77,10 +90,19 @@ def run(replay: ReplayManager, map_name, use_pygame=False):
             game.comms.post_message(message=comms_line)
             game.handle_client_response()
         else:
+            log_with_time(f"Path cache: {m.path_cache_info()}")
+            log_with_time(f"Path budget exhaustions: {dict(m.budget_exhaustions)}")
             results = game.results()
             replay.post_custom_replay_line(results)  # post results in replay file
-            with open("replay/results.json", "w") as file:
-                file.write(json.dumps(results, separators=(",", ":")))
+            with open(results_path, "w") as file:
+                # response times differ every run, so unlike the rest they stay out of the replay
+                results_file = {
+                    **results,
+                    "response_times": game.comms.response_time_stats(),
+                }
+                file.write(json.dumps(results_file, separators=(",", ":")))
+
+    game.close()
 
     if use_pygame:
         pygame.quit()
@@ -91,9 +113,7 @@ def game_started():
 
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        filename="replay/server.log", encoding="utf-8", level=logging.INFO
-    )
+    setup_logging()
     logging.info(sys.argv)
 
     while not sys.argv[-1].strip():
@@ -109,15 +129,23 @@ if __name__ == "__main__":
     log_with_time("Creating replay manager")
     replay = ReplayManager(config.REPLAY.PATH, config.REPLAY.LIVE_PATH, True)
 
+    input_log = (
+        InputLog(config.REPLAY.INPUT_LOG_PATH) if config.REPLAY.INPUT_LOG_PATH else None
+    )
+
     log_with_time("Running the game")
     try:
         run(
             replay,
             map_name=config.MAP.DIR + args.map or config.MAP.NUKETOWN,
             use_pygame=str(os.environ.get("USE_PYGAME", 1)) == "1",
+            input_log=input_log,
         )
     except Exception as e:
         replay.empty_buffer()
         raise e
     finally:
-        replay.empty_buffer()
+        replay.close()
+        if input_log is not None:
+            input_log.close()
+        stop_logging()
@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import zipfile
+from array import array
+from collections import Counter, OrderedDict, defaultdict
 from collections.abc import Callable, Generator
 
+import numpy as np
 from yaml import safe_load
 
 from config import config
@@ -10,6 +22,490 @@ from gameObjects import Tank, Wall
 from gameObjects.game_object import GameObject
 
 
+class PathGrid:
+    """
+    Flat, array-backed grid used for pathfinding.
+
+    Cells are stored row by row in a bytearray with a one cell wide non-walkable border,
+    so neighbour lookups are plain index arithmetic and never need bounds checks.
+    Searches use Jump Point Search with diagonal moves only allowed when neither
+    adjacent orthogonal cell is blocked (DiagonalMovement.only_when_no_obstacle).
+    """
+
+    SQRT2_MINUS_1 = math.sqrt(2) - 1
+
+    def __init__(self, traversability: np.ndarray):
+        self.height, self.width = traversability.shape
+        self.stride = self.width + 2
+        self.size = self.stride * (self.height + 2)
+        self.walkable = bytearray(np.pad(traversability, 1).astype(np.uint8).tobytes())
+
+    def _index(self, y: int, x: int) -> int:
+        return (y + 1) * self.stride + x + 1
+
+    def _coords(self, index: int) -> tuple[int, int]:
+        y, x = divmod(index, self.stride)
+        return y - 1, x - 1
+
+    def set_walkable(self, y: int, x: int, walkable: bool):
+        self.walkable[self._index(y, x)] = walkable
+
+    def update(self, traversability: np.ndarray, y0: int, y1: int, x0: int, x1: int):
+        """Copies the rows y0:y1, columns x0:x1 of traversability into the grid."""
+        for y in range(y0, y1):
+            start = self._index(y, x0)
+            self.walkable[start : start + x1 - x0] = traversability[y, x0:x1].tobytes()
+
+    def line_of_sight(self, a: int, b: int) -> int:
+        """
+        Walks the cells crossed by the straight line between the centres of cells a and b.
+        Returns the first non-walkable cell, or -1 if the line is clear. Cell a itself is not checked.
+        A line passing exactly through a corner needs both cells beside the corner to be walkable.
+        """
+        walkable = self.walkable
+        stride = self.stride
+        (ay, ax), (by, bx) = divmod(a, stride), divmod(b, stride)
+        nx, ny = abs(bx - ax), abs(by - ay)
+        step_x = (bx > ax) - (bx < ax)
+        step_y = ((by > ay) - (by < ay)) * stride
+        index = a
+        ix = iy = 0
+        while ix < nx or iy < ny:
+            decision = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+            if decision == 0:
+                if not walkable[index + step_x]:
+                    return index + step_x
+                if not walkable[index + step_y]:
+                    return index + step_y
+                index += step_x + step_y
+                ix += 1
+                iy += 1
+            elif decision < 0:
+                index += step_x
+                ix += 1
+            else:
+                index += step_y
+                iy += 1
+            if not walkable[index]:
+                return index
+        return -1
+
+    def _octile(self, a: int, b: int) -> float:
+        ay, ax = divmod(a, self.stride)
+        by, bx = divmod(b, self.stride)
+        dy, dx = abs(ay - by), abs(ax - bx)
+        return max(dx, dy) + self.SQRT2_MINUS_1 * min(dx, dy)
+
+    def _jump(self, index: int, dx: int, dy: int, goal: int) -> int:
+        """Walks from index in direction (dx, dy) and returns the next jump point, or -1."""
+        walkable = self.walkable
+        stride = self.stride
+        step = dy * stride + dx
+        while True:
+            if not walkable[index]:
+                return -1
+            if index == goal:
+                return index
+            if dx and dy:
+                if (
+                    self._jump(index + dx, dx, 0, goal) != -1
+                    or self._jump(index + dy * stride, 0, dy, goal) != -1
+                ):
+                    return index
+                if not (walkable[index + dx] and walkable[index + dy * stride]):
+                    return -1
+            elif dx:
+                if (walkable[index - stride] and not walkable[index - dx - stride]) or (
+                    walkable[index + stride] and not walkable[index - dx + stride]
+                ):
+                    return index
+            elif (walkable[index - 1] and not walkable[index - 1 - dy * stride]) or (
+                walkable[index + 1] and not walkable[index + 1 - dy * stride]
+            ):
+                return index
+            index += step
+
+    def _directions(self, index: int, parent: int) -> list[tuple[int, int]]:
+        """Directions worth searching from index, pruned by the direction we arrived from."""
+        walkable = self.walkable
+        stride = self.stride
+        if parent == -1:
+            directions = []
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                if walkable[index + dy * stride + dx]:
+                    directions.append((dx, dy))
+            for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if walkable[index + dx] and walkable[index + dy * stride]:
+                    directions.append((dx, dy))
+            return directions
+
+        (y, x), (py, px) = divmod(index, stride), divmod(parent, stride)
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        directions = []
+        if dx and dy:
+            vertical = walkable[index + dy * stride]
+            horizontal = walkable[index + dx]
+            if vertical:
+                directions.append((0, dy))
+            if horizontal:
+                directions.append((dx, 0))
+            if vertical and horizontal:
+                directions.append((dx, dy))
+        elif dx:
+            ahead = walkable[index + dx]
+            up = walkable[index - stride]
+            down = walkable[index + stride]
+            if ahead:
+                directions.append((dx, 0))
+                if up:
+                    directions.append((dx, -1))
+                if down:
+                    directions.append((dx, 1))
+            if up:
+                directions.append((0, -1))
+            if down:
+                directions.append((0, 1))
+        else:
+            ahead = walkable[index + dy * stride]
+            left = walkable[index - 1]
+            right = walkable[index + 1]
+            if ahead:
+                directions.append((0, dy))
+                if left:
+                    directions.append((-1, dy))
+                if right:
+                    directions.append((1, dy))
+            if left:
+                directions.append((-1, 0))
+            if right:
+                directions.append((1, 0))
+        return directions
+
+    def _expand(self, jump_points: list[int]) -> list[tuple[int, int]]:
+        """Fills in every grid cell between consecutive jump points."""
+        path = [self._coords(jump_points[0])]
+        for a, b in zip(jump_points, jump_points[1:]):
+            (ay, ax), (by, bx) = divmod(a, self.stride), divmod(b, self.stride)
+            dx = (bx > ax) - (bx < ax)
+            dy = (by > ay) - (by < ay)
+            step = dy * self.stride + dx
+            while a != b:
+                a += step
+                path.append(self._coords(a))
+        return path
+
+    def distance_field(self, goal: tuple[int, int]) -> array:
+        """
+        Works out the length of the shortest path from every cell to goal (Dijkstra from the goal).
+        Cells that cannot reach goal are left at infinity.
+        """
+        field = DistanceField(self, goal)
+        field.build()
+        return field.distances
+
+    def follow_distance_field(
+        self, distances: array, start: tuple[int, int]
+    ) -> list[tuple[int, int]]:
+        """
+        Builds a shortest path from start by repeatedly stepping to the neighbour closest to the goal
+        of a distance field. Takes time proportional to the length of the path.
+        """
+        walkable = self.walkable
+        stride = self.stride
+        index = self._index(*start)
+        if distances[index] == math.inf:
+            return []
+
+        sqrt2 = math.sqrt(2)
+        path = [start]
+        while distances[index] > 0:
+            best, best_distance = -1, math.inf
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                neighbour = index + dy * stride + dx
+                if walkable[neighbour] and distances[neighbour] + 1 < best_distance:
+                    best, best_distance = neighbour, distances[neighbour] + 1
+            for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if not (walkable[index + dx] and walkable[index + dy * stride]):
+                    continue
+                neighbour = index + dy * stride + dx
+                if walkable[neighbour] and distances[neighbour] + sqrt2 < best_distance:
+                    best, best_distance = neighbour, distances[neighbour] + sqrt2
+            index = best
+            path.append(self._coords(index))
+        return path
+
+    def find_path(
+        self,
+        start: tuple[int, int],
+        end: tuple[int, int],
+        node_budget: int | None = None,
+        time_budget: float | None = None,
+    ) -> tuple[list[tuple[int, int]], bool]:
+        """
+        Finds a shortest path between two (y, x) cells.
+        Returns every cell on the path including both ends (or an empty list if end is unreachable),
+        and whether the search completed.
+
+        Args:
+            node_budget (int | None): most jump points to expand before giving up
+            time_budget (float | None): most seconds to search for before giving up
+
+        When a budget runs out, the path returned leads to the expanded cell closest to end instead.
+        """
+        start_index = self._index(*start)
+        goal = self._index(*end)
+        if start_index == goal:
+            return [start], True
+        if not self.walkable[goal]:
+            return [], True
+
+        g_score = array("d", [math.inf]) * self.size
+        parents = array("l", [-1]) * self.size
+        # 0: unseen, 1: in the open set, 2: closed
+        state = bytearray(self.size)
+
+        g_score[start_index] = 0
+        state[start_index] = 1
+        open_set = [(0.0, start_index)]
+        closest, closest_distance = start_index, self._octile(start_index, goal)
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        expanded = 0
+        while open_set:
+            _, index = heapq.heappop(open_set)
+            if state[index] == 2:
+                continue
+            state[index] = 2
+            if index == goal:
+                return self._backtrack(parents, index), True
+
+            distance = self._octile(index, goal)
+            if distance < closest_distance:
+                closest, closest_distance = index, distance
+            expanded += 1
+            if (node_budget is not None and expanded > node_budget) or (
+                deadline is not None
+                and expanded % 16 == 0
+                and time.perf_counter() > deadline
+            ):
+                return self._backtrack(parents, closest), False
+
+            for dx, dy in self._directions(index, parents[index]):
+                jump_point = self._jump(index + dy * self.stride + dx, dx, dy, goal)
+                if jump_point == -1 or state[jump_point] == 2:
+                    continue
+                g = g_score[index] + self._octile(index, jump_point)
+                if g < g_score[jump_point]:
+                    g_score[jump_point] = g
+                    parents[jump_point] = index
+                    state[jump_point] = 1
+                    heapq.heappush(
+                        open_set, (g + self._octile(jump_point, goal), jump_point)
+                    )
+        return [], True
+
+    def _backtrack(self, parents: array, index: int) -> list[tuple[int, int]]:
+        jump_points = []
+        while index != -1:
+            jump_points.append(index)
+            index = parents[index]
+        return self._expand(jump_points[::-1])
+
+
+class DistanceField:
+    """
+    The length of the shortest path from every cell of a grid to goal, worked out by a Dijkstra
+    from the goal that can be run a bounded number of cells at a time.
+    Cells that cannot reach goal are left at infinity.
+    """
+
+    def __init__(self, grid: PathGrid, goal: tuple[int, int]):
+        self.grid = grid
+        goal_index = grid._index(*goal)
+        self.distances = array("d", [math.inf]) * grid.size
+        self.distances[goal_index] = 0
+        self._open_set = [(0.0, goal_index)] if grid.walkable[goal_index] else []
+        # Every cell at most this far from goal already has its final distance
+        self.radius = 0.0 if self._open_set else math.inf
+
+    @property
+    def complete(self) -> bool:
+        return not self._open_set
+
+    def reaches(self, cell: tuple[int, int]) -> bool:
+        """Whether the distance from cell is final, so the field can already be followed from it."""
+        return self.distances[self.grid._index(*cell)] <= self.radius
+
+    def build(
+        self, node_budget: int | None = None, time_budget: float | None = None
+    ) -> bool:
+        """
+        Carries on working out distances, for at most node_budget cells and time_budget seconds.
+        Returns whether the field is complete.
+        """
+        walkable = self.grid.walkable
+        stride = self.grid.stride
+        distances = self.distances
+        open_set = self._open_set
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        sqrt2 = math.sqrt(2)
+        settled = 0
+        while open_set:
+            if (node_budget is not None and settled >= node_budget) or (
+                deadline is not None
+                and settled % 64 == 0
+                and time.perf_counter() > deadline
+            ):
+                return False
+            distance, index = heapq.heappop(open_set)
+            if distance > distances[index]:
+                continue
+            self.radius = distance
+            settled += 1
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                neighbour = index + dy * stride + dx
+                if distance + 1 < distances[neighbour]:
+                    distances[neighbour] = distance + 1
+                    # Non-walkable cells can still be left from (e.g. where a tank starts), never entered
+                    if walkable[neighbour]:
+                        heapq.heappush(open_set, (distance + 1, neighbour))
+            for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if not (walkable[index + dx] and walkable[index + dy * stride]):
+                    continue
+                neighbour = index + dy * stride + dx
+                if distance + sqrt2 < distances[neighbour]:
+                    distances[neighbour] = distance + sqrt2
+                    if walkable[neighbour]:
+                        heapq.heappush(open_set, (distance + sqrt2, neighbour))
+        self.radius = math.inf
+        return True
+
+
+class VisibilityGraph:
+    """
+    Visibility graph over the special points of a map, used for any-angle paths.
+
+    Edges are only worked out when a point is first expanded by a search, and are kept up to date
+    as the grid changes: for every pair found to be blocked, the first blocking cell is remembered,
+    so opening that cell (a broken wall) only re-checks the pairs it was blocking.
+    """
+
+    def __init__(self, grid: PathGrid, points: set[tuple[int, int]]):
+        self.grid = grid
+        self.points = set(points)
+        self._edges: dict[tuple[int, int], dict[tuple[int, int], float]] = {}
+        self._blocked_by: defaultdict[int, set[tuple]] = defaultdict(set)
+
+    def _check_pair(self, p: tuple[int, int], q: tuple[int, int]) -> bool:
+        blocker = self.grid.line_of_sight(self.grid._index(*p), self.grid._index(*q))
+        if blocker != -1:
+            self._blocked_by[blocker].add((p, q))
+            return False
+        distance = math.dist(p, q)
+        self._edges[p][q] = distance
+        if q in self._edges:
+            self._edges[q][p] = distance
+        return True
+
+    def neighbours(self, p: tuple[int, int]) -> dict[tuple[int, int], float]:
+        """Special points visible from p, with their distances."""
+        if p not in self._edges:
+            self._edges[p] = {}
+            for q in self.points:
+                if q == p:
+                    continue
+                if q in self._edges:
+                    if p in self._edges[q]:
+                        self._edges[p][q] = self._edges[q][p]
+                else:
+                    self._check_pair(p, q)
+        return self._edges[p]
+
+    def add_point(self, p: tuple[int, int]):
+        if p in self.points:
+            return
+        self.points.add(p)
+        for q in list(self._edges):
+            self._check_pair(q, p)
+
+    def remove_point(self, p: tuple[int, int]):
+        if p not in self.points:
+            return
+        self.points.discard(p)
+        self._edges.pop(p, None)
+        for edges in self._edges.values():
+            edges.pop(p, None)
+
+    def cell_opened(self, index: int):
+        """Re-checks the pairs that were blocked by a cell that has become walkable."""
+        for p, q in self._blocked_by.pop(index, ()):
+            if p in self._edges and q in self.points and q not in self._edges[p]:
+                self._check_pair(p, q)
+
+    def cell_blocked(self, index: int):
+        """Forgets every known edge, as any of them may cross a cell that has become non-walkable."""
+        self._edges.clear()
+        self._blocked_by.clear()
+
+    def _visible_points(self, cell: tuple[int, int]) -> dict[tuple[int, int], float]:
+        index = self.grid._index(*cell)
+        return {
+            p: math.dist(cell, p)
+            for p in self.points
+            if self.grid.line_of_sight(index, self.grid._index(*p)) == -1
+        }
+
+    def find_path(
+        self, start: tuple[int, int], end: tuple[int, int]
+    ) -> list[tuple[int, int]]:
+        """
+        Finds a shortest any-angle path between two (y, x) cells, going through special points only.
+        Returns the waypoints including both ends, or an empty list if end is unreachable.
+        """
+        if start == end:
+            return [start]
+        grid = self.grid
+        end_index = grid._index(*end)
+        if not grid.walkable[end_index]:
+            return []
+        if grid.line_of_sight(grid._index(*start), end_index) == -1:
+            return [start, end]
+
+        # Distances to the goal are symmetric, so points that can see the goal can reach it directly
+        to_end = self._visible_points(end)
+        g_score = {start: 0.0}
+        parents: dict[tuple[int, int], tuple[int, int] | None] = {start: None}
+        closed = set()
+        open_set = [(math.dist(start, end), start)]
+        while open_set:
+            _, p = heapq.heappop(open_set)
+            if p in closed:
+                continue
+            closed.add(p)
+            if p == end:
+                path = []
+                while p is not None:
+                    path.append(p)
+                    p = parents[p]
+                return path[::-1]
+
+            neighbours = (
+                self._visible_points(start) if p == start else self.neighbours(p)
+            )
+            candidates = list(neighbours.items())
+            if p in to_end:
+                candidates.append((end, to_end[p]))
+            for q, distance in candidates:
+                if q in closed:
+                    continue
+                g = g_score[p] + distance
+                if g < g_score.get(q, math.inf):
+                    g_score[q] = g
+                    parents[q] = p
+                    heapq.heappush(open_set, (g + math.dist(q, end), q))
+        return []
+
+
 class Map:
     CHARACTER_MAP = {
         ".": None,
@@ -27,6 +523,8 @@ class Map:
     }
     TRAVERSABLE = ".SP"
     SPECIAL_CHARS = "P"
+    # Bump when the layout of compiled maps changes, so stale caches are ignored
+    COMPILED_VERSION = 1
 
     def __init__(self, map_name: str):
         """_summary_
@@ -61,9 +559,34 @@ class Map:
         # Map format: width/height, ascii grid, yaml
         self.objects: dict[tuple[int, int], GameObject] = {}
         self.fn_objects: dict[tuple[int, int], Callable] = {}
-        self.traversability: list[list[bool]] = []
+        self.traversability: np.ndarray
+        # Bumped whenever traversability changes, so cached paths from older grids are never reused
+        self.revision = 0
+        # Values are (path, whether the search completed within its budget)
+        self._path_cache: OrderedDict[tuple, tuple[list, bool]] = OrderedDict()
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        # Distance fields towards popular goal cells, valid for the current revision only
+        self._distance_fields: OrderedDict[tuple[int, int], array] = OrderedDict()
+        self._goal_requests: Counter[tuple[int, int]] = Counter()
+        # Distance fields still being built, a search budget at a time, by the requests for their goal
+        self._field_builds: OrderedDict[tuple[int, int], DistanceField] = OrderedDict()
+        # Number of searches that ran out of budget, by requester
+        self.budget_exhaustions: Counter[str | None] = Counter()
         with open(self.map_name) as f:
-            contents = list(f.readlines())
+            self.source = f.read()
+
+        compiled_path = self._compiled_path()
+        if compiled_path is None or not self._load_compiled(compiled_path):
+            self._parse_map()
+            self._precomp()
+            self._seed_spawn_distance_fields()
+            if compiled_path is not None:
+                self._save_compiled(compiled_path)
+
+    def _parse_map(self):
+        """Parses the ASCII map in self.source."""
+        contents = self.source.splitlines(keepends=True)
         self.map_width, self.map_height = list(map(int, contents[0].split()))
         map_ascii = contents[1 : self.map_height + 1]
         yaml = "\n".join(contents[self.map_height + 1 :]).strip()
@@ -75,11 +598,77 @@ class Map:
                     f"Not enough characters to define {self.map_width} wide "
                     f"by {self.map_height} tall grid"
                 )
-            self.traversability.append([False] * self.map_width)
             for x in range(self.map_width):
                 self._handle_character(y, x, map_ascii[y][x])
+        self.characters = np.frombuffer(
+            "".join(row[: self.map_width] for row in map_ascii).encode(), dtype=np.uint8
+        ).reshape(self.map_height, self.map_width)
+        self.traversability = np.isin(self.characters, list(self.TRAVERSABLE.encode()))
+
+    def _seed_spawn_distance_fields(self):
+        """Tanks start on spawn cells, so they are the first goals worth having distance fields for."""
+        for y, x in np.argwhere(self.characters == ord("S")).tolist():
+            self._distance_fields[(y, x)] = self.grid.distance_field((y, x))
 
-        self._precomp()
+    # COMPILED MAP CACHE
+
+    def _compiled_path(self) -> str | None:
+        """Where the compiled form of this map is cached, keyed by the content of the map file."""
+        if not config.MAP.CACHE_DIR:
+            return None
+        digest = hashlib.sha256(self.source.encode()).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(self.map_name))[0]
+        return os.path.join(
+            config.MAP.CACHE_DIR, f"{name}-{digest}-v{self.COMPILED_VERSION}.npz"
+        )
+
+    def _save_compiled(self, path: str):
+        """Writes the parsed map and everything precomputed from it. Failing to write the cache is not fatal."""
+        spawns = list(self._distance_fields)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path), suffix=".npz", delete=False
+            ) as f:
+                np.savez(
+                    f,
+                    characters=self.characters,
+                    objects=np.array(list(self.fn_objects), dtype=np.int32).reshape(
+                        -1, 2
+                    ),
+                    special=self.special,
+                    spawns=np.array(spawns, dtype=np.int32).reshape(-1, 2),
+                    spawn_distance_fields=np.array(
+                        [np.frombuffer(self._distance_fields[s]) for s in spawns]
+                    ).reshape(len(spawns), self.grid.size),
+                    extra_config=np.array(json.dumps(self.extra_config)),
+                )
+            os.replace(f.name, path)
+        except (OSError, TypeError) as e:
+            logging.warning(f"Could not cache compiled map at {path}: {e}")
+
+    def _load_compiled(self, path: str) -> bool:
+        """Loads a compiled map written by _save_compiled. Returns False if there is no usable one."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                self.characters = data["characters"]
+                objects = data["objects"].tolist()
+                self.special = data["special"]
+                spawns = data["spawns"].tolist()
+                spawn_distance_fields = data["spawn_distance_fields"]
+                self.extra_config = json.loads(str(data["extra_config"]))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return False
+
+        self.map_height, self.map_width = self.characters.shape
+        self.traversability = np.isin(self.characters, list(self.TRAVERSABLE.encode()))
+        for y, x in objects:
+            self.fn_objects[(y, x)] = self.CHARACTER_MAP[chr(self.characters[y, x])]
+        self.special_points = set(map(tuple, np.argwhere(self.special).tolist()))
+        self._build_pathfinding()
+        for (y, x), distances in zip(spawns, spawn_distance_fields):
+            self._distance_fields[(y, x)] = array("d", distances.tobytes())
+        return True
 
     def _handle_character(self, y: int, x: int, character: str) -> None:
         """
@@ -90,19 +679,30 @@ class Map:
             raise MapLoadError(
                 f"Invalid character found in map file {character} at line {y+2} column {x+1}."
             )
-        self.traversability[y][x] = character in self.TRAVERSABLE
         if character in self.CHARACTER_MAP:
             if self.CHARACTER_MAP[character] is not None:
                 self.fn_objects[(y, x)] = self.CHARACTER_MAP[character]
 
     def update_traversability_boundary(self):
         p = self.closing_boundary_progress
-        for i in range(self.map_height):
-            self.traversability[i][p] = False
-            self.traversability[i][self.map_width - p - 1] = False
-        for i in range(self.map_width):
-            self.traversability[p][i] = False
-            self.traversability[self.map_height - p - 1][i] = False
+        h, w = self.map_height, self.map_width
+        # The rows and columns the boundary has just closed over, as (y0, y1, x0, x1) slices
+        strips = [
+            (p, p + 1, 0, w),
+            (h - p - 1, h - p, 0, w),
+            (0, h, p, p + 1),
+            (0, h, w - p - 1, w - p),
+        ]
+        for y0, y1, x0, x1 in strips:
+            y0, y1, x0, x1 = max(y0, 0), min(y1, h), max(x0, 0), min(x1, w)
+            if y0 >= y1 or x0 >= x1:
+                continue
+            self.traversability[y0:y1, x0:x1] = False
+            self.grid.update(self.traversability, y0, y1, x0, x1)
+            if self.visibility is not None:
+                self.visibility.cell_blocked(self.grid._index(y0, x0))
+            self._update_special_points(y0, y1, x0, x1)
+        self._bump_revision()
         self.closing_boundary_progress += 1
 
     def create_game_objects(self, space) -> Generator[GameObject, None, None]:
@@ -121,39 +721,31 @@ class Map:
     # PATHFINDING UTILS
 
     def _precomp(self):
-        from pathfinding.core.grid import Grid
-
+        """Builds the pathfinding grid. Later changes are applied to it in place."""
         self._gen_special_points()
-        self.pf_grid = Grid(matrix=self.traversability)
+        self._build_pathfinding()
 
-    def _is_special(self, y, x):
-        if not self.traversability[y][x]:
-            return False
-        points = [
-            (y, x + 1),
-            (y + 1, x + 1),
-            (y + 1, x),
-            (y + 1, x - 1),
-            (y, x - 1),
-            (y - 1, x - 1),
-            (y - 1, x),
-            (y - 1, x + 1),
-            (y, x + 1),
-        ]
-        for z in range(0, 7, 2):
-            if (
-                0 <= points[z][0] < self.map_height
-                and 0 <= points[z][1] < self.map_width
-                and 0 <= points[z + 2][0] < self.map_height
-                and 0 <= points[z + 2][1] < self.map_width
-            ):
-                if (
-                    self.traversability[points[z][0]][points[z][1]]
-                    and not self.traversability[points[z + 1][0]][points[z + 1][1]]
-                    and self.traversability[points[z + 2][0]][points[z + 2][1]]
-                ):
-                    return True
-        return False
+    def _build_pathfinding(self):
+        self.grid = PathGrid(self.traversability)
+        # Only path_shortcut uses the visibility graph, so it is built (and kept up to date) once it is first needed
+        self.visibility: VisibilityGraph | None = None
+
+    def _special_mask(self, traversability: np.ndarray) -> np.ndarray:
+        """
+        Marks the special cells of a block of the grid, using shifted copies of the traversability.
+        The outermost ring of the block is only used as context, so the result is 2 cells smaller
+        in each dimension.
+        """
+        centre = traversability[1:-1, 1:-1]
+        height, width = centre.shape
+
+        def shifted(dy, dx):
+            return traversability[1 + dy : 1 + dy + height, 1 + dx : 1 + dx + width]
+
+        mask = np.zeros_like(centre)
+        for dy, dx in ((1, 1), (1, -1), (-1, -1), (-1, 1)):
+            mask |= shifted(0, dx) & shifted(dy, 0) & ~shifted(dy, dx)
+        return centre & mask
 
     def _gen_special_points(self):
         """
@@ -161,55 +753,143 @@ class Map:
         This ensures that the shortest path between any tiles on the map can begin with a straight line
         to a special point.
         """
-        self.special_points = set()
-        for y in range(self.map_height):
-            for x in range(self.map_width):
-                if self._is_special(y, x):
-                    self.special_points.add((y, x))
+        self.special = self._special_mask(np.pad(self.traversability, 1))
+        self.special_points = set(map(tuple, np.argwhere(self.special).tolist()))
+
+    def _update_special_points(self, y0: int, y1: int, x0: int, x1: int):
+        """Re-checks whether the cells in rows y0:y1, columns x0:x1 and those surrounding them are special."""
+        y0, y1 = max(y0 - 1, 0), min(y1 + 1, self.map_height)
+        x0, x1 = max(x0 - 1, 0), min(x1 + 1, self.map_width)
+        # Take one more cell of context on every side, with non-traversable cells beyond the map edges
+        window = np.zeros((y1 - y0 + 2, x1 - x0 + 2), dtype=bool)
+        wy0, wy1 = max(y0 - 1, 0), min(y1 + 1, self.map_height)
+        wx0, wx1 = max(x0 - 1, 0), min(x1 + 1, self.map_width)
+        window[
+            wy0 - y0 + 1 : wy1 - y0 + 1, wx0 - x0 + 1 : wx1 - x0 + 1
+        ] = self.traversability[wy0:wy1, wx0:wx1]
+        special = self._special_mask(window)
+        for dy, dx in np.argwhere(special != self.special[y0:y1, x0:x1]).tolist():
+            point = (y0 + dy, x0 + dx)
+            if special[dy, dx]:
+                self.special_points.add(point)
+                if self.visibility is not None:
+                    self.visibility.add_point(point)
+            else:
+                self.special_points.discard(point)
+                if self.visibility is not None:
+                    self.visibility.remove_point(point)
+        self.special[y0:y1, x0:x1] = special
 
     def register_wall_broken(self, coords):
         """Call this function when a wall is broken to update pathfinding."""
-        from pathfinding.core.node import Node
-
         (cy, cx) = self.from_global_coords(*coords)
-        self.pf_grid.nodes[cy][cx] = Node(cx, cy, True)
-        self.traversability[cy][cx] = True
-        # Re-check if this point or those surrounding is special
-        for y in range(cy - 1, cy + 2):
-            for x in range(cx - 1, cx + 2):
-                if self._is_special(y, x):
-                    self.special_points.add((y, x))
+        self.traversability[cy, cx] = True
+        self.grid.set_walkable(cy, cx, True)
+        if self.visibility is not None:
+            self.visibility.cell_opened(self.grid._index(cy, cx))
+        self._update_special_points(cy, cy + 1, cx, cx + 1)
+        self._bump_revision()
+
+    def _bump_revision(self):
+        """Marks the grid as changed and evicts every cached path computed on the old grid."""
+        self.revision += 1
+        self._path_cache.clear()
+        self._distance_fields.clear()
+        self._goal_requests.clear()
+        self._field_builds.clear()
+
+    def path_cache_info(self) -> dict[str, int]:
+        return {
+            "hits": self.path_cache_hits,
+            "misses": self.path_cache_misses,
+            "size": len(self._path_cache),
+            "max_size": config.PATHFINDING.CACHE_SIZE,
+            "distance_fields": len(self._distance_fields),
+        }
 
-    def path(self, c1, c2):
+    def _distance_field(
+        self, goal: tuple[int, int], start: tuple[int, int]
+    ) -> array | None:
+        """
+        Returns a distance field towards goal that can be followed from start, or None.
+        Goals asked for often enough in the current revision get a field. It is built by the requests
+        for the goal, each carrying the build on within the search budgets, so that building one never
+        holds up a request for longer than a search may.
+        """
+        if goal in self._distance_fields:
+            self._distance_fields.move_to_end(goal)
+            return self._distance_fields[goal]
+
+        self._goal_requests[goal] += 1
+        if self._goal_requests[goal] < config.PATHFINDING.DISTANCE_FIELD_MIN_REQUESTS:
+            return None
+        field = self._field_builds.pop(goal, None) or DistanceField(self.grid, goal)
+        if field.build(config.PATHFINDING.NODE_BUDGET, config.PATHFINDING.TIME_BUDGET):
+            self._distance_fields[goal] = field.distances
+            if (
+                len(self._distance_fields)
+                > config.PATHFINDING.DISTANCE_FIELD_CACHE_SIZE
+            ):
+                self._distance_fields.popitem(last=False)
+            return field.distances
+
+        self._field_builds[goal] = field
+        if len(self._field_builds) > config.PATHFINDING.DISTANCE_FIELD_CACHE_SIZE:
+            self._field_builds.popitem(last=False)
+        return field.distances if field.reaches(start) else None
+
+    def path(self, c1, c2, requester: str | None = None):
         """
         Finds the shortest path between two grid points,
         when constrained to the grid world (but allowed to move diagonally)
         Inefficient path chosen on large open fields.
-        """
-        from pathfinding.core.diagonal_movement import DiagonalMovement
-        from pathfinding.finder.a_star import AStarFinder
+        Results are kept in a bounded LRU cache until the grid changes, and goals that are asked
+        for repeatedly get a cached distance field that any start cell can follow.
 
+        Searches, and the building of distance fields, are bounded by PATHFINDING.NODE_BUDGET and
+        PATHFINDING.TIME_BUDGET. When a search runs out of budget the path leads towards c2 as far as
+        the search got, and the exhaustion is counted against requester.
+        """
         if not (self._is_valid_coord(*c1) and self._is_valid_coord(*c2)):
             raise CoordinateError(f"Coordinates out of map's bounds: {c1}, {c2}")
 
-        self._precomp()
-        start = self.pf_grid.node(c1[1], c1[0])
-        end = self.pf_grid.node(c2[1], c2[0])
-        finder = AStarFinder(diagonal_movement=DiagonalMovement.only_when_no_obstacle)
-        path, runs = finder.find_path(start, end, self.pf_grid)
-        self.pf_grid.cleanup()
-        return list(map(lambda p: (p[1], p[0]), path))
+        key = (tuple(c1), tuple(c2), self.revision)
+        if key in self._path_cache:
+            self.path_cache_hits += 1
+            self._path_cache.move_to_end(key)
+            path, complete = self._path_cache[key]
+        else:
+            self.path_cache_misses += 1
+            distances = self._distance_field(tuple(c2), tuple(c1))
+            if distances is not None:
+                path, complete = (
+                    self.grid.follow_distance_field(distances, tuple(c1)),
+                    True,
+                )
+            else:
+                path, complete = self.grid.find_path(
+                    tuple(c1),
+                    tuple(c2),
+                    config.PATHFINDING.NODE_BUDGET,
+                    config.PATHFINDING.TIME_BUDGET,
+                )
+
+            self._path_cache[key] = (path, complete)
+            if len(self._path_cache) > config.PATHFINDING.CACHE_SIZE:
+                self._path_cache.popitem(last=False)
+
+        if not complete:
+            self.budget_exhaustions[requester] += 1
+        return list(path)
 
     def path_shortcut(self, c1, c2):
         """
-        Finds a pretty good path on an open gridworld by restricting the grid-path
-        to some particular points.
+        Finds a pretty good path on an open gridworld by searching the visibility graph
+        of the special points directly, moving in straight lines between them.
         """
-        to_remove = []
-        path = self.path(c1, c2)
-        for x in range(1, len(path) - 1):
-            if path[x] not in self.special_points:
-                to_remove.append(x)
-        for x in to_remove[::-1]:
-            del path[x]
-        return path
+        if not (self._is_valid_coord(*c1) and self._is_valid_coord(*c2)):
+            raise CoordinateError(f"Coordinates out of map's bounds: {c1}, {c2}")
+
+        if self.visibility is None:
+            self.visibility = VisibilityGraph(self.grid, self.special_points)
+        return self.visibility.find_path(tuple(c1), tuple(c2))
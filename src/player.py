@@ -8,10 +8,17 @@ import exceptions
 from config import config
 from gameObjects.tank import Tank
 from map import Map
+from scheduler import Event, Scheduler
 
 
 class Player:
-    def __init__(self, player_object: Tank, map: Map, client_info: dict):
+    def __init__(
+        self,
+        player_object: Tank,
+        map: Map,
+        client_info: dict,
+        scheduler: Scheduler,
+    ):
         self.gameobject: Tank = player_object
         self.gameobject.id = (
             f"tank-{client_info['id']}"  # Override tank id to have client id
@@ -26,6 +33,10 @@ class Player:
 
         self.action = {"path": deque(), "move": False}
 
+        self.scheduler = scheduler
+        # Arrival at the next waypoint of the path
+        self._arrival: Event | None = None
+
     def register_actions(self, actions: t.Optional[dict]) -> t.List:
         """
         register action for the player.
@@ -46,19 +57,16 @@ class Player:
                 created_game_objects.append(self._shoot_bullet(angle=actions[action]))
         return created_game_objects
 
-    def tick(self):
-        """This will be called at every tick."""
-        if not self.action["move"]:
-            self._traverse_path()
-
     def _move(self, angle: float):
         # remove path if manual move is used
         self.action["path"] = deque()
 
         if angle == -1:
             self.action["move"] = False
+            self.follow_path()  # nothing left to follow, so this stops the tank
         else:
             self.action["move"] = True
+            self._cancel_arrival()
 
             # the magnitude of the vector should be square root of 2
             angle_radians = math.radians(angle)
@@ -69,32 +77,40 @@ class Player:
                 )
             )
 
-    def _set_distance_to_target(self):
-        self.distance_to_target = sum(
-            map(
-                lambda a, b: abs(a - b),
-                self.gameobject.body.position,
-                self.action["path"][0],
-            )
-        )
-
-    def _traverse_path(self):
-        """Move the player through a previously calculated path (self.action["path"]) until the path is complete"""
+    def follow_path(self):
+        """
+        Heads for the next waypoint of the path, or stops the tank if there is none.
+        The tank moves in a straight line at constant speed, so the step it reaches the waypoint
+        at is known now and arrival is scheduled for then. This is called again whenever a
+        collision knocks the tank off course.
+        """
+        if self.action["move"]:
+            return
+        self._cancel_arrival()
         if not self.action["path"]:
             self._set_direction(
                 (0, 0)
             )  # stop moving the player once the target has been reached
             return
-        last_distance_to_target = self.distance_to_target
-        self._set_distance_to_target()
+        waypoint = self.action["path"][0]
+        self.gameobject.move_to_pos(waypoint)
+        step_length = (
+            self.gameobject.body.velocity.length * config.SIMULATION.PHYSICS_TIMESTEP
+        )
+        distance = self.gameobject.body.position.get_distance(waypoint)
+        self._arrival = self.scheduler.schedule(
+            max(1, math.ceil(distance / step_length)), self._arrive
+        )
+
+    def _arrive(self):
+        self._arrival = None
+        self.action["path"].popleft()
+        self.follow_path()
 
-        if last_distance_to_target < self.distance_to_target:
-            if self.action["path"]:
-                self.gameobject.move_to_pos(self.action["path"][0])
-        elif self.distance_to_target <= 1:
-            self.action["path"].popleft()
-            if self.action["path"]:
-                self.gameobject.move_to_pos(self.action["path"][0])
+    def _cancel_arrival(self):
+        if self._arrival:
+            self._arrival.cancel()
+            self._arrival = None
 
     def _set_path(self, coord: tuple[int, int]):
         """calculate and set the path attribute if the target is coord
@@ -106,6 +122,7 @@ class Player:
 
         if not coord:
             self.action["path"] = deque()
+            self.follow_path()
             return
         try:
             self.action["path"] = deque(
@@ -114,18 +131,17 @@ class Player:
                     self.map.path(
                         self.map.from_global_coords(*self.gameobject.body.position),
                         self.map.from_global_coords(*coord),
+                        requester=self.client_id,
                     ),
                 )
             )
             if len(self.action["path"]) > 0:
                 self.action["path"].popleft()
-            if self.action["path"]:
-                self.gameobject.move_to_pos(self.action["path"][0])
-                self._set_distance_to_target()
         except exceptions.CoordinateError:
             # TODO: client input coordinates were out of bounds.
             # The server shouldn't care about coordinates being out of bounds because the game has boundaries.
             self.action["path"] = deque()
+        self.follow_path()
 
         self.target = coord
 
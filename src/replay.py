@@ -1,9 +1,25 @@
 from __future__ import annotations
 
+import itertools
 import json
+import math
+import os
 from dataclasses import asdict, is_dataclass
 from typing import Any
 
+import pymunk
+
+from config import config
+from gameObjects.game_object import GameObject
+from replay_binary import BinaryReplayEncoder
+from replay_writer import COMPRESSION_SUFFIXES, ReplayWriter
+from state_table import StateTable
+from util import EncodedMessage
+
+# Segments are written out once their lines add up to this many characters (bytes for binary replays)
+SEGMENT_SIZE = 50 * 500
+EOF_LINE = '"EOF"\n'
+
 
 class ReplayJSONEncoder(json.JSONEncoder):
     def default(self, o):
@@ -14,6 +30,37 @@ class ReplayJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+# Encodes the objects of a message one by one, so they can be spliced into every output (see _encode_delta)
+_encode = ReplayJSONEncoder(separators=(",", ":")).encode
+
+# Stand-ins for the position and velocity when encoding the rest of an object's state, see _state_template
+_POSITION = "\x00position"
+_VELOCITY = "\x00velocity"
+
+
+def apply_object_updates(
+    object_states: dict[str, dict[str, Any]],
+    message: dict,
+    field_deltas: bool = False,
+) -> dict[str, dict[str, Any]]:
+    """
+    Applies the deleted and updated objects of a replay line or client message to object_states,
+    the state of every object so far, and returns it.
+    With field_deltas, updates only carry the fields that changed and a field set to None was removed.
+    """
+    for object_id, object_data in message["updated_objects"].items():
+        if not field_deltas:
+            object_states[object_id] = object_data
+            continue
+        state = {**object_states.get(object_id, {}), **object_data}
+        object_states[object_id] = {
+            key: value for key, value in state.items() if value is not None
+        }
+    for object_id in message["deleted_objects"]:
+        object_states.pop(object_id, None)
+    return object_states
+
+
 class ReplayManager:
     """
     Manager for posting replays to a file.
@@ -24,66 +71,233 @@ class ReplayManager:
     """
 
     def __init__(
-        self, output_path: str, live_replay_path: str, is_multi_file: bool
+        self,
+        output_path: str,
+        live_replay_path: str | None,
+        is_multi_file: bool,
+        replay_field_deltas: bool | None = None,
+        comms_field_deltas: bool | None = None,
+        replay_format: str | None = None,
     ) -> None:
         self.is_multi_file = is_multi_file
 
+        # With field deltas, updated objects only carry the fields that changed since they were last sent
+        self.replay_field_deltas = (
+            config.REPLAY.FIELD_DELTAS
+            if replay_field_deltas is None
+            else replay_field_deltas
+        )
+        self.comms_field_deltas = (
+            config.COMMUNICATION.FIELD_DELTAS
+            if comms_field_deltas is None
+            else comms_field_deltas
+        )
+
         self.file_number = 1
 
         self.output_path = output_path
+        # Every file written is also copied here for live viewing, unless this is None
         self.live_replay_path = live_replay_path
 
-        # Buffer is the list of all lines that are waiting to be written in the replay file
+        # "json" writes JSON lines to .txt segments, "binary" writes replay_binary records to .bin segments
+        self.format = config.REPLAY.FORMAT if replay_format is None else replay_format
+        if self.format == "binary":
+            self.binary_encoder = BinaryReplayEncoder(config.REPLAY.KEYFRAME_INTERVAL)
+        elif self.format != "json":
+            raise ValueError(f"Unknown replay format {self.format}")
+
+        # Segments are compressed with this ("zlib", "lzma" or None) once finished
+        self.compression = config.REPLAY.COMPRESSION
+        if (
+            self.compression is not None
+            and self.compression not in COMPRESSION_SUFFIXES
+        ):
+            raise ValueError(f"Unknown replay compression {self.compression}")
+        self.writer = ReplayWriter(config.REPLAY.BACKGROUND_WRITER)
+
+        # Buffer is the list of all lines that are waiting to be written in the replay file,
+        # and buffer_size their total length
         self.buffer = []
+        self.buffer_size = 0
+        if self.format == "binary":
+            self._append_to_buffer(self.binary_encoder.start_segment())
+
+        # Index of the replay, written next to the segments as <path>-index.json - see replay_reader.py.
+        # Tick records (the lines written by sync_object_updates_in_replay) are numbered from 0.
+        self.tick_count = 0
+        self.segments = []
+        # First and last tick record in the segment being buffered
+        self._segment_ticks: list[int] | None = None
+        # Full state after every SNAPSHOT_INTERVAL tick records, written to <path>-snapshots.jsonl
+        self.snapshot_interval = config.REPLAY.SNAPSHOT_INTERVAL
+        self.snapshots = []
+        self._snapshot_lines = []
+        self._snapshots_size = 0
+        self._snapshots_started = False
 
         self.events = []
         self.current_info = {}
         self.new_info = {}
         self.comms_info = {}
         self.replay_path_indicators = []
+        self._path_indicators_json = "[]"
+        # Set whenever path indicators are added to or removed from the space
+        self.path_indicators_changed = True
 
+        # Rounded position, velocity and hp of moving objects when last recorded - used to skip unchanged ones
+        self.state_table = StateTable()
         # The last state of all objects in the game - used for diffing
-        self.replay_current_object_states = {}
-        # List of objects that are updated and are waiting to be written
-        self.replay_pending_object_updates = {}
-        # List of object ids that were deleted and are waiting to be written
-        self.replay_pending_object_deletes = []
-
-        # This logic needs to happen twice - one for writing replay lines, one for writing client messages.
-        # The objects below are used for client messages.
-        self.comms_current_object_states = {}
-        self.comms_pending_object_updates = {}
-        self.comms_pending_object_deletes = []
+        self.current_object_states = {}
+        # List of objects that are updated and are waiting to be diffed
+        self.pending_object_updates = {}
+        # List of object ids that were deleted and are waiting to be diffed
+        self.pending_object_deletes = []
+
+        # Each diff is computed once and merged into a delta for each output until that output is synced:
+        # replay lines are written after every physics batch, client messages once per communication tick.
+        self.replay_delta = self._empty_delta()
+        self.comms_delta = self._empty_delta()
+        # The JSON replay lines and client messages are spliced from the encoding of each updated object,
+        # '"id":{...}', made once when it is diffed. Not used for outputs with field deltas.
+        self._encode_replay = self.format == "json" and not self.replay_field_deltas
+        self._encode_comms = not self.comms_field_deltas
+        self._fragments: dict[str, str] = {}
+        # Fragments of the pending updates of moving objects, made from the templates of their state
+        self._pending_fragments: dict[str, str] = {}
+        self._state_templates: dict[str, tuple[str, str, str] | None] = {}
 
     def record_deleted_object(self, deleted_object_id):
-        self.replay_pending_object_deletes.append(deleted_object_id)
-        self.comms_pending_object_deletes.append(deleted_object_id)
+        self.state_table.release(deleted_object_id)
+        self._state_templates.pop(deleted_object_id, None)
+        self.pending_object_deletes.append(deleted_object_id)
 
     def record_object_state(self, object_id: str, object_data: dict[str, Any]):
-        self.replay_pending_object_updates[object_id] = object_data
-        self.comms_pending_object_updates[object_id] = object_data
+        self.pending_object_updates[object_id] = object_data
+        self._pending_fragments.pop(object_id, None)
 
     def empty_buffer(self):
-        # Add EOF to buffer before flushing it out
-        self.buffer.append('"EOF"\n')
+        if self.format == "binary":
+            self.buffer.append(self.binary_encoder.end_segment())
+            extension = "bin"
+        else:
+            # Add EOF to buffer before flushing it out
+            self.buffer.append(EOF_LINE)
+            extension = "txt"
+        if self.compression is not None:
+            extension += COMPRESSION_SUFFIXES[self.compression]
+
+        # the buffer is handed over to the writer thread, which joins, compresses and writes it
+        file_name = f"{self.output_path}-{self.file_number}.{extension}"
+        self.writer.write(
+            file_name,
+            self._live_path(f"-{self.file_number}.{extension}"),
+            self.buffer,
+            self.compression,
+        )
 
-        file_names = (
-            f"{self.output_path}-{self.file_number}.txt",
-            f"{self.live_replay_path}-{self.file_number}.txt",
+        first_tick, last_tick = self._segment_ticks or (None, None)
+        self.segments.append(
+            {
+                "file": os.path.basename(file_name),
+                "first_tick": first_tick,
+                "last_tick": last_tick,
+            }
         )
-        for file_name in file_names:
-            with open(file_name, "w") as f:
-                f.writelines(self.buffer)
+        self._segment_ticks = None
 
         self.buffer = []
+        self.buffer_size = 0
         self.file_number += 1
+        if self.format == "binary":
+            self._append_to_buffer(self.binary_encoder.start_segment())
+
+        self._write_index()
+
+    def _live_path(self, suffix: str) -> str | None:
+        return None if self.live_replay_path is None else self.live_replay_path + suffix
+
+    def close(self):
+        """Writes out what is left in the buffer and waits until everything is on disk."""
+        self.empty_buffer()
+        self.writer.close()
+
+    def _write_index(self):
+        """Writes the snapshots taken so far and an index of the segments written so far."""
+        index = {
+            "format": self.format,
+            "field_deltas": self.replay_field_deltas,
+            "ticks": self.tick_count,
+            "segments": self.segments,
+            "snapshot_file": None,
+            # only snapshots that point into segments already written
+            "snapshots": [
+                snapshot
+                for snapshot in self.snapshots
+                if snapshot["segment"] < self.file_number
+            ],
+        }
+        snapshot_file = f"{self.output_path}-snapshots.jsonl"
+        index["snapshot_file"] = os.path.basename(snapshot_file)
+        self.writer.write(
+            snapshot_file,
+            self._live_path("-snapshots.jsonl"),
+            self._snapshot_lines,
+            append=self._snapshots_started,
+        )
+        self.writer.write(
+            f"{self.output_path}-index.json",
+            self._live_path("-index.json"),
+            [json.dumps(index, separators=(",", ":"))],
+        )
+        self._snapshot_lines = []
+        self._snapshots_started = True
+
+    def _take_snapshot(self, tick: int):
+        """Records the full state after tick record `tick`, and where the records after it start."""
+        line = (
+            json.dumps(
+                {
+                    "tick": tick,
+                    "objects": self.current_object_states,
+                    "path_indicators": self.replay_path_indicators,
+                },
+                cls=ReplayJSONEncoder,
+                separators=(",", ":"),
+            )
+            + "\n"
+        )
+        self.snapshots.append(
+            {
+                "tick": tick,
+                "offset": self._snapshots_size,
+                "segment": self.file_number,
+                "segment_offset": self.buffer_size,
+            }
+        )
+        self._snapshot_lines.append(line)
+        self._snapshots_size += len(line)
+        if self.format == "binary":
+            # binary records depend on what came before them, so decoding has to start at a keyframe
+            self.binary_encoder.request_keyframe()
+
+    def _append_to_buffer(self, line):
+        self.buffer.append(line)
+        self.buffer_size += len(line)
 
     def write_to_buffer(self, obj):
-        serialized_obj = json.dumps(obj, cls=ReplayJSONEncoder, separators=(",", ":"))
-        self.buffer.append(serialized_obj + "\n")
+        if self.format == "binary":
+            self._append_to_buffer(self.binary_encoder.encode(obj))
+        else:
+            if isinstance(obj, EncodedMessage):
+                serialized_obj = obj.json
+            else:
+                serialized_obj = json.dumps(
+                    obj, cls=ReplayJSONEncoder, separators=(",", ":")
+                )
+            self._append_to_buffer(serialized_obj + "\n")
 
         # Flush buffer if it's gotten too big (more than 50 lines of each 500 characters)
-        if self.is_multi_file and sum([len(x) for x in self.buffer]) >= 50 * 500:
+        if self.is_multi_file and self.buffer_size >= SEGMENT_SIZE:
             self.empty_buffer()
 
     def post_custom_replay_line(self, obj: dict) -> None:
@@ -94,15 +308,87 @@ class ReplayManager:
         self.write_to_buffer(obj)
 
     def set_game_info(self, space):
-        self.replay_path_indicators = []
-        for x in space.shapes:
-            if hasattr(x, "_gameobject"):
+        """
+        Records the state of every object in the space that may have changed:
+        those marked dirty since the last call, and those that can move.
+        """
+        if self.path_indicators_changed:
+            self.path_indicators_changed = False
+            self.replay_path_indicators = [
+                x.body.position for x in space.shapes if not hasattr(x, "_gameobject")
+            ]
+            self._path_indicators_json = _encode(self.replay_path_indicators)
+
+        for game_object in GameObject.pop_dirty():
+            # whatever made it dirty may have changed more than its position and velocity
+            self._state_templates.pop(game_object.id, None)
+            if game_object.is_in(space):
+                self._record_game_object(game_object)
+
+        tabled = []
+        for body in space.bodies:
+            if body.body_type != pymunk.Body.STATIC:
+                for x in body.shapes:
+                    if not hasattr(x, "_gameobject"):
+                        continue
+                    if x._gameobject.columnar_state:
+                        tabled.append(x._gameobject)
+                    else:
+                        self._record_game_object(x._gameobject)
+
+        if tabled:
+            changed, position, velocity = self.state_table.update(
+                [game_object.id for game_object in tabled],
+                [game_object.body.position for game_object in tabled],
+                [game_object.body.velocity for game_object in tabled],
+                [game_object.hp for game_object in tabled],
+            )
+            for game_object, game_object_position, game_object_velocity in zip(
+                itertools.compress(tabled, changed),
+                position[changed].tolist(),
+                velocity[changed].tolist(),
+            ):
                 self.record_object_state(
-                    x._gameobject.id,
-                    x._gameobject.info(),
+                    game_object.id,
+                    game_object.state_info(game_object_position, game_object_velocity),
                 )
-            else:
-                self.replay_path_indicators.append(x.body.position)
+                if not (self._encode_replay or self._encode_comms):
+                    continue
+                template = self._state_template(game_object)
+                # repr() only writes floats as JSON does when they are finite (not NaN or Infinity)
+                if template is not None and math.isfinite(
+                    sum(game_object_position) + sum(game_object_velocity)
+                ):
+                    head, middle, tail = template
+                    self._pending_fragments[game_object.id] = (
+                        f"{head}{game_object_position[0]!r},{game_object_position[1]!r}"
+                        f"{middle}{game_object_velocity[0]!r},{game_object_velocity[1]!r}{tail}"
+                    )
+
+    def _state_template(self, game_object: GameObject) -> tuple[str, str, str] | None:
+        """
+        The fragment of a moving object split around its position and velocity, which are all that
+        change from one sync to the next until the object is marked dirty.
+        Finite floats are written by repr() as in JSON, so filling it in with them gives what encoding
+        state_info() does.
+        """
+        if game_object.id in self._state_templates:
+            return self._state_templates[game_object.id]
+        fragment = (
+            f"{_encode(game_object.id)}:"
+            f"{_encode(game_object.state_info(_POSITION, _VELOCITY))}"
+        )
+        parts = fragment.split(_encode(_POSITION))
+        if len(parts) == 2 and parts[1].count(_encode(_VELOCITY)) == 1:
+            middle, tail = parts[1].split(_encode(_VELOCITY))
+            template = (parts[0] + "[", "]" + middle + "[", "]" + tail)
+        else:
+            template = None
+        self._state_templates[game_object.id] = template
+        return template
+
+    def _record_game_object(self, game_object: GameObject):
+        self.record_object_state(game_object.id, game_object.info())
 
     def _find_object_diffs(self, current_state, new_updates):
         changed_objects = {}
@@ -119,45 +405,124 @@ class ReplayManager:
             except KeyError:
                 pass
 
-    def sync_object_updates_in_replay(self):
+    @staticmethod
+    def _empty_delta():
+        return {"deleted_objects": [], "updated_objects": {}}
+
+    def _diff_pending(self):
+        """
+        Diffs the pending updates against the current state, and merges the result into the replay and
+        comms deltas.
+        """
         pending_object_updates = self._find_object_diffs(
-            self.replay_current_object_states, self.replay_pending_object_updates
+            self.current_object_states, self.pending_object_updates
         )
-
-        message = {
-            "deleted_objects": self.replay_pending_object_deletes,
-            "updated_objects": pending_object_updates,
-            "path_indicators": self.replay_path_indicators,
-        }
-
-        self.write_to_buffer(message)
+        if self.replay_field_deltas or self.comms_field_deltas:
+            pending_field_updates = {
+                object_id: self._changed_fields(
+                    self.current_object_states.get(object_id, {}), object_data
+                )
+                for object_id, object_data in pending_object_updates.items()
+            }
+
+        if self._encode_replay or self._encode_comms:
+            pending_fragments = self._pending_fragments
+            for object_id, object_data in pending_object_updates.items():
+                self._fragments[object_id] = (
+                    pending_fragments.get(object_id)
+                    or f"{_encode(object_id)}:{_encode(object_data)}"
+                )
+            self._pending_fragments = {}
 
         # Update stale locations
-        self.replay_current_object_states.update(pending_object_updates)
-        self.replay_pending_object_updates = {}
+        self.current_object_states.update(pending_object_updates)
+        self.pending_object_updates = {}
 
         self._remove_pending_deletes(
-            self.replay_pending_object_deletes, self.replay_current_object_states
+            self.pending_object_deletes, self.current_object_states
         )
-        self.replay_pending_object_deletes = []
 
-    def sync_object_updates_in_comms(self):
-        pending_object_updates = self._find_object_diffs(
-            self.comms_current_object_states, self.comms_pending_object_updates
+        for delta, field_deltas in (
+            (self.replay_delta, self.replay_field_deltas),
+            (self.comms_delta, self.comms_field_deltas),
+        ):
+            delta["deleted_objects"].extend(self.pending_object_deletes)
+            if not field_deltas:
+                delta["updated_objects"].update(pending_object_updates)
+                continue
+            updated_objects = delta["updated_objects"]
+            for object_id, fields in pending_field_updates.items():
+                updated_objects[object_id] = (
+                    {**updated_objects[object_id], **fields}
+                    if object_id in updated_objects
+                    else fields
+                )
+        self.pending_object_deletes = []
+
+    @staticmethod
+    def _changed_fields(
+        old_data: dict[str, Any], new_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        """The fields of new_data that differ from old_data. Fields that are no longer there are set to None."""
+        fields = {
+            key: value
+            for key, value in new_data.items()
+            if key not in old_data or old_data[key] != value
+        }
+        for key in old_data.keys() - new_data.keys():
+            fields[key] = None
+        return fields
+
+    def _encode_delta(self, delta: dict, tail: str = "") -> str:
+        """Splices the JSON of delta from the fragments of its updated objects, followed by tail."""
+        fragments = self._fragments
+        updated_objects = ",".join(
+            fragments[object_id]
+            if object_id in fragments
+            else f"{_encode(object_id)}:{_encode(object_data)}"
+            for object_id, object_data in delta["updated_objects"].items()
         )
+        return (
+            f'{{"deleted_objects":{_encode(delta["deleted_objects"])},'
+            f'"updated_objects":{{{updated_objects}}}{tail}}}'
+        )
+
+    def sync_object_updates_in_replay(self):
+        self._diff_pending()
 
         message = {
-            "deleted_objects": self.comms_pending_object_deletes,
-            "updated_objects": pending_object_updates,
+            **self.replay_delta,
+            "path_indicators": self.replay_path_indicators,
         }
+        if self._encode_replay:
+            message = EncodedMessage(
+                message,
+                self._encode_delta(
+                    self.replay_delta,
+                    f',"path_indicators":{self._path_indicators_json}',
+                ),
+            )
+
+        tick = self.tick_count
+        self.tick_count += 1
+        if self._segment_ticks is None:
+            self._segment_ticks = [tick, tick]
+        self._segment_ticks[1] = tick
 
-        # Clear events and update all objects' info
-        self.comms_current_object_states.update(pending_object_updates)
-        self.comms_pending_object_updates = {}
+        self.write_to_buffer(message)
+        self.replay_delta = self._empty_delta()
 
-        self._remove_pending_deletes(
-            self.comms_pending_object_deletes, self.comms_current_object_states
-        )
-        self.comms_pending_object_deletes = []
+        if self.tick_count % self.snapshot_interval == 0:
+            self._take_snapshot(tick)
+
+    def sync_object_updates_in_comms(self):
+        self._diff_pending()
+
+        message = self.comms_delta
+        self.comms_delta = self._empty_delta()
+        if self._encode_comms:
+            message = EncodedMessage(message, self._encode_delta(message))
+        for object_id in message["deleted_objects"]:
+            self._fragments.pop(object_id, None)
 
         return message
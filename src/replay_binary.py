@@ -0,0 +1,479 @@
+"""
+Compact binary replay format, written by ReplayManager when REPLAY.FORMAT is "binary".
+
+A segment file is a header followed by records. Every record stands for one line of the JSON replay,
+except keyframes, which hold the full state the decoder keeps (so decoding can start at any of them),
+and EOF, which stands for the "EOF" line that ends every JSON segment.
+
+- Strings (object ids, keys, values) are written once and referred to by index afterwards.
+  The string table restarts at every keyframe.
+- Floats with at most 2 decimals, which is how positions and velocities are rounded, are written as
+  integer hundredths. Other floats are written as 8 byte doubles, so nothing is lost.
+- Tick records (the deleted_objects / updated_objects / path_indicators lines) write each updated
+  object as only the fields that changed since that object was last written, and positions and
+  velocities as the difference from their last value.
+
+Converting back gives exactly the JSON lines the JSON writer would have written:
+
+python src/replay_binary.py replay/replay [--output replay.txt | --segments converted/replay]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+from collections.abc import Iterator
+from dataclasses import asdict, is_dataclass
+from typing import Any
+
+from replay_writer import COMPRESSION_SUFFIXES, read_segment
+
+MAGIC = b"CQRB"
+VERSION = 1
+
+# Record tags
+LINE, TICK, KEYFRAME, EOF = range(4)
+
+# Value tags
+NULL, FALSE, TRUE, INT, Q2, F64, STR, LIST, DICT, Q2_PAIR, Q2_PAIR_DELTA = range(11)
+
+# How an updated object is written in a tick record
+FULL, FIELDS = range(2)
+
+TICK_KEYS = ("deleted_objects", "updated_objects", "path_indicators")
+
+# Yielded by BinaryReplayDecoder where a segment ended, which is an "EOF" line in the JSON replay
+SEGMENT_END = object()
+
+
+class ReplayFormatError(Exception):
+    pass
+
+
+def _zigzag(n: int) -> int:
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n // 2 if n % 2 == 0 else -(n + 1) // 2
+
+
+def _write_varint(out: bytearray, n: int):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _hundredths(value: float) -> int | None:
+    """value as a whole number of hundredths, if that represents it exactly (and it is not -0.0)."""
+    if not math.isfinite(value) or (value == 0 and math.copysign(1, value) < 0):
+        return None
+    hundredths = round(value * 100)
+    return hundredths if hundredths / 100 == value else None
+
+
+def _q2_pair(value) -> tuple[int, int] | None:
+    if (
+        isinstance(value, (list, tuple))
+        and len(value) == 2
+        and type(value[0]) is float
+        and type(value[1]) is float
+    ):
+        x, y = _hundredths(value[0]), _hundredths(value[1])
+        if x is not None and y is not None:
+            return x, y
+    return None
+
+
+def _json_key(key) -> str:
+    """Dictionary keys the way json.dumps turns them into strings."""
+    if isinstance(key, str):
+        return str.__str__(key)
+    if key is True or key is False or key is None:
+        return json.dumps(key)
+    if isinstance(key, (int, float)):
+        return json.dumps(key)
+    raise TypeError(
+        f"keys must be str, int, float, bool or None, not {type(key).__name__}"
+    )
+
+
+class BinaryReplayEncoder:
+    def __init__(self, keyframe_interval: int):
+        self.keyframe_interval = keyframe_interval
+
+        # The last written value of every object, which updates to it are delta encoded against
+        self._objects: dict[str, dict[str, Any]] = {}
+        self._path_indicators = None
+        self._strings: dict[str, int] = {}
+        self._ticks_since_keyframe = 0
+        self._keyframe_due = True
+
+    def start_segment(self) -> bytes:
+        """The header of a new segment file. The first record of every segment follows a keyframe."""
+        self._keyframe_due = True
+        return MAGIC + bytes([VERSION])
+
+    def request_keyframe(self):
+        """Makes the next record follow a keyframe."""
+        self._keyframe_due = True
+
+    def end_segment(self) -> bytes:
+        return bytes([EOF])
+
+    def encode(self, obj) -> bytes:
+        """Encodes one replay line."""
+        out = bytearray()
+        is_tick = isinstance(obj, dict) and tuple(obj) == TICK_KEYS
+        if self._keyframe_due or (
+            is_tick and self._ticks_since_keyframe >= self.keyframe_interval
+        ):
+            self._write_keyframe(out)
+        if is_tick:
+            out.append(TICK)
+            self._write_tick(out, obj)
+            self._ticks_since_keyframe += 1
+        else:
+            out.append(LINE)
+            self._write_value(out, obj)
+        return bytes(out)
+
+    def _write_keyframe(self, out: bytearray):
+        self._strings = {}
+        self._ticks_since_keyframe = 0
+        self._keyframe_due = False
+        out.append(KEYFRAME)
+        _write_varint(out, len(self._objects))
+        for object_id, object_data in self._objects.items():
+            self._write_string(out, object_id)
+            self._write_value(out, object_data)
+        self._write_value(out, self._path_indicators)
+
+    def _write_tick(self, out: bytearray, obj: dict):
+        deleted_objects = obj["deleted_objects"]
+        _write_varint(out, len(deleted_objects))
+        for object_id in deleted_objects:
+            self._write_string(out, object_id)
+
+        updated_objects = obj["updated_objects"]
+        _write_varint(out, len(updated_objects))
+        for object_id, object_data in updated_objects.items():
+            self._write_string(out, object_id)
+            self._write_object(out, self._objects.get(object_id), object_data)
+            self._objects[object_id] = object_data
+
+        for object_id in deleted_objects:
+            self._objects.pop(object_id, None)
+
+        if _same(obj["path_indicators"], self._path_indicators):
+            out.append(0)
+        else:
+            out.append(1)
+            self._write_value(out, obj["path_indicators"])
+            self._path_indicators = obj["path_indicators"]
+
+    def _write_object(self, out: bytearray, old_data: dict | None, new_data: dict):
+        if (
+            not isinstance(old_data, dict)
+            or not isinstance(new_data, dict)
+            or list(old_data) != list(new_data)
+        ):
+            out.append(FULL)
+            self._write_value(out, new_data)
+            return
+
+        out.append(FIELDS)
+        changed = [
+            i
+            for i, (old_value, new_value) in enumerate(
+                zip(old_data.values(), new_data.values())
+            )
+            if not _same(old_value, new_value)
+        ]
+        _write_varint(out, sum(1 << i for i in changed))
+        old_values, new_values = list(old_data.values()), list(new_data.values())
+        for i in changed:
+            old_pair, new_pair = _q2_pair(old_values[i]), _q2_pair(new_values[i])
+            if old_pair and new_pair:
+                out.append(Q2_PAIR_DELTA)
+                _write_varint(out, _zigzag(new_pair[0] - old_pair[0]))
+                _write_varint(out, _zigzag(new_pair[1] - old_pair[1]))
+            else:
+                self._write_value(out, new_values[i])
+
+    def _write_string(self, out: bytearray, value: str):
+        index = self._strings.get(value)
+        if index is None:
+            self._strings[value] = len(self._strings)
+            data = value.encode()
+            _write_varint(out, 0)
+            _write_varint(out, len(data))
+            out += data
+        else:
+            _write_varint(out, index + 1)
+
+    def _write_value(self, out: bytearray, value):
+        if value is None:
+            out.append(NULL)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            out.append(INT)
+            _write_varint(out, _zigzag(int(value)))
+        elif isinstance(value, float):
+            hundredths = _hundredths(value)
+            if hundredths is None:
+                out.append(F64)
+                out += struct.pack("<d", value)
+            else:
+                out.append(Q2)
+                _write_varint(out, _zigzag(hundredths))
+        elif isinstance(value, str):
+            out.append(STR)
+            self._write_string(out, str.__str__(value))
+        elif isinstance(value, dict):
+            out.append(DICT)
+            _write_varint(out, len(value))
+            for key, item in value.items():
+                self._write_string(out, _json_key(key))
+                self._write_value(out, item)
+        elif isinstance(value, (list, tuple)):
+            pair = _q2_pair(value)
+            if pair:
+                out.append(Q2_PAIR)
+                _write_varint(out, _zigzag(pair[0]))
+                _write_varint(out, _zigzag(pair[1]))
+                return
+            out.append(LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self._write_value(out, item)
+        elif is_dataclass(value):
+            self._write_value(out, asdict(value))
+        else:
+            raise TypeError(
+                f"Object of type {type(value).__name__} is not replay serializable"
+            )
+
+
+def _same(a, b) -> bool:
+    """Whether b is written exactly like a. Equality is not enough: 1 == 1.0 == True, and 0.0 == -0.0."""
+    if a is b:
+        return True
+    if type(a) is not type(b) or a != b:
+        return False
+    if type(a) is float:
+        return math.copysign(1, a) == math.copysign(1, b)
+    if isinstance(a, (list, tuple, dict)):
+        return json.dumps(a, default=str) == json.dumps(b, default=str)
+    return True
+
+
+class BinaryReplayDecoder:
+    def __init__(self):
+        self._objects: dict[str, dict[str, Any]] = {}
+        self._path_indicators = None
+        self._strings: list[str] = []
+
+    def decode(self, data: bytes, start: int = 0) -> Iterator:
+        """
+        Yields the replay lines of a segment file in order, and SEGMENT_END where it ends.
+        Decoding can start part way through the file if start is the offset of a keyframe.
+        """
+        if data[: len(MAGIC)] != MAGIC or data[len(MAGIC)] != VERSION:
+            raise ReplayFormatError("Not a binary replay segment")
+        self._data = memoryview(data)
+        self._pos = max(start, len(MAGIC) + 1)
+        while self._pos < len(self._data):
+            tag = self._read_byte()
+            if tag == KEYFRAME:
+                self._read_keyframe()
+            elif tag == TICK:
+                yield self._read_tick()
+            elif tag == LINE:
+                yield self._read_value()
+            elif tag == EOF:
+                yield SEGMENT_END
+            else:
+                raise ReplayFormatError(f"Unknown record {tag} at byte {self._pos - 1}")
+
+    def _read_byte(self) -> int:
+        self._pos += 1
+        return self._data[self._pos - 1]
+
+    def _read_varint(self) -> int:
+        n = shift = 0
+        while True:
+            byte = self._read_byte()
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return n
+            shift += 7
+
+    def _read_keyframe(self):
+        self._strings = []
+        self._objects = {}
+        for _ in range(self._read_varint()):
+            object_id = self._read_string()
+            self._objects[object_id] = self._read_value()
+        self._path_indicators = self._read_value()
+
+    def _read_tick(self) -> dict:
+        deleted_objects = [self._read_string() for _ in range(self._read_varint())]
+
+        updated_objects = {}
+        for _ in range(self._read_varint()):
+            object_id = self._read_string()
+            if self._read_byte() == FULL:
+                object_data = self._read_value()
+            else:
+                object_data = self._read_fields(self._objects[object_id])
+            updated_objects[object_id] = object_data
+            self._objects[object_id] = object_data
+
+        for object_id in deleted_objects:
+            self._objects.pop(object_id, None)
+
+        if self._read_byte():
+            self._path_indicators = self._read_value()
+
+        return {
+            "deleted_objects": deleted_objects,
+            "updated_objects": updated_objects,
+            "path_indicators": self._path_indicators,
+        }
+
+    def _read_fields(self, old_data: dict) -> dict:
+        changed = self._read_varint()
+        object_data = {}
+        for i, (key, value) in enumerate(old_data.items()):
+            if changed >> i & 1:
+                if self._data[self._pos] == Q2_PAIR_DELTA:
+                    self._pos += 1
+                    x = round(value[0] * 100) + _unzigzag(self._read_varint())
+                    y = round(value[1] * 100) + _unzigzag(self._read_varint())
+                    value = [x / 100, y / 100]
+                else:
+                    value = self._read_value()
+            object_data[key] = value
+        return object_data
+
+    def _read_string(self) -> str:
+        index = self._read_varint()
+        if index:
+            return self._strings[index - 1]
+        length = self._read_varint()
+        value = str(self._data[self._pos : self._pos + length], "utf-8")
+        self._pos += length
+        self._strings.append(value)
+        return value
+
+    def _read_value(self):
+        tag = self._read_byte()
+        if tag == NULL:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            return _unzigzag(self._read_varint())
+        if tag == Q2:
+            return _unzigzag(self._read_varint()) / 100
+        if tag == F64:
+            self._pos += 8
+            return struct.unpack("<d", self._data[self._pos - 8 : self._pos])[0]
+        if tag == STR:
+            return self._read_string()
+        if tag == DICT:
+            return {
+                self._read_string(): self._read_value()
+                for _ in range(self._read_varint())
+            }
+        if tag == LIST:
+            return [self._read_value() for _ in range(self._read_varint())]
+        if tag == Q2_PAIR:
+            x = _unzigzag(self._read_varint())
+            y = _unzigzag(self._read_varint())
+            return [x / 100, y / 100]
+        raise ReplayFormatError(f"Unknown value {tag} at byte {self._pos - 1}")
+
+
+def segment_paths(output_path: str) -> list[str]:
+    """The segment files of a binary replay written to output_path, compressed or not, in order."""
+    paths = []
+    while True:
+        candidates = [
+            f"{output_path}-{len(paths) + 1}.bin{suffix}"
+            for suffix in ("", *COMPRESSION_SUFFIXES.values())
+        ]
+        found = [path for path in candidates if os.path.isfile(path)]
+        if not found:
+            return paths
+        paths.append(found[0])
+
+
+def read_lines(paths: list[str]) -> Iterator:
+    """Yields every replay line of the given segment files, and SEGMENT_END where each ends."""
+    decoder = BinaryReplayDecoder()
+    for path in paths:
+        yield from decoder.decode(read_segment(path))
+
+
+def main():
+    from replay import EOF_LINE, SEGMENT_SIZE, ReplayJSONEncoder
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("replay", help="path the replay was written to, without -N.bin")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--output", help="JSON lines file to write, standard output if not given"
+    )
+    output.add_argument(
+        "--segments",
+        help="write JSON segment files to this path (as <path>-N.txt) the way the JSON writer splits them",
+    )
+    args = parser.parse_args()
+
+    paths = segment_paths(args.replay)
+    if not paths:
+        parser.error(f"no segments found at {args.replay}-1.bin")
+
+    def serialize(obj) -> str:
+        return json.dumps(obj, cls=ReplayJSONEncoder, separators=(",", ":")) + "\n"
+
+    if not args.segments:
+        out = open(args.output, "w") if args.output else sys.stdout
+        for obj in read_lines(paths):
+            out.write(EOF_LINE if obj is SEGMENT_END else serialize(obj))
+        if args.output:
+            out.close()
+        return
+
+    file_number = 1
+    buffer: list[str] = []
+
+    def write_segment():
+        nonlocal file_number, buffer
+        with open(f"{args.segments}-{file_number}.txt", "w") as f:
+            f.writelines(buffer + [EOF_LINE])
+        file_number += 1
+        buffer = []
+
+    for obj in read_lines(paths):
+        if obj is SEGMENT_END:
+            continue
+        buffer.append(serialize(obj))
+        if sum(len(line) for line in buffer) >= SEGMENT_SIZE:
+            write_segment()
+    write_segment()
+
+
+if __name__ == "__main__":
+    main()
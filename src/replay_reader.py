@@ -0,0 +1,118 @@
+"""
+Random access to replays through the index ReplayManager writes next to the segment files.
+
+Rebuilding the state at a tick reads one full-state snapshot and the tick records after it,
+instead of every line since the start of the game:
+
+python src/replay_reader.py <path> <tick>
+
+prints the state of every object and the path indicators after tick record <tick> (counted from 0).
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import sys
+from collections.abc import Iterator
+
+from replay import EOF_LINE, apply_object_updates
+from replay_binary import SEGMENT_END, BinaryReplayDecoder
+from replay_writer import read_segment
+
+
+class ReplayReader:
+    def __init__(self, output_path: str):
+        """output_path is the path the replay was written to, without the -index.json suffix."""
+        self.directory = os.path.dirname(output_path)
+        with open(f"{output_path}-index.json") as f:
+            self.index = json.load(f)
+        self.field_deltas = self.index["field_deltas"]
+        self.snapshots = self.index["snapshots"]
+        self._snapshot_ticks = [snapshot["tick"] for snapshot in self.snapshots]
+
+    @property
+    def ticks(self) -> int:
+        """Number of tick records in the replay."""
+        return self.index["ticks"]
+
+    def segment_of(self, tick: int) -> int:
+        """The number of the segment file (from 1) holding tick record `tick`."""
+        for number, segment in enumerate(self.index["segments"], 1):
+            if (
+                segment["first_tick"] is not None
+                and segment["first_tick"] <= tick <= segment["last_tick"]
+            ):
+                return number
+        raise IndexError(f"Tick {tick} is not in the replay")
+
+    def state_at(self, tick: int) -> dict:
+        """Returns the objects and path indicators as they were after tick record `tick`."""
+        if not 0 <= tick < self.ticks:
+            raise IndexError(f"Tick {tick} is not in the replay")
+
+        position = bisect.bisect_right(self._snapshot_ticks, tick) - 1
+        if position >= 0:
+            snapshot = self.snapshots[position]
+            state = self._read_snapshot(snapshot["offset"])
+            current_tick = snapshot["tick"]
+            lines = self._lines(snapshot["segment"], snapshot["segment_offset"])
+        else:
+            state = {"objects": {}, "path_indicators": []}
+            current_tick = -1
+            lines = self._lines(1, 0)
+
+        for line in lines:
+            if current_tick == tick:
+                break
+            if "updated_objects" not in line:
+                continue
+            apply_object_updates(state["objects"], line, self.field_deltas)
+            state["path_indicators"] = line["path_indicators"]
+            current_tick += 1
+        return {
+            "objects": state["objects"],
+            "path_indicators": state["path_indicators"],
+        }
+
+    def lines(self) -> Iterator[dict]:
+        """Yields every line of the replay, leaving out the EOF lines that end segments."""
+        return self._lines(1, 0)
+
+    def _read_snapshot(self, offset: int) -> dict:
+        with open(os.path.join(self.directory, self.index["snapshot_file"])) as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def _lines(self, segment: int, offset: int) -> Iterator[dict]:
+        """Yields the replay lines from offset in the given segment file onwards."""
+        segments = self.index["segments"][segment - 1 :]
+        for file_name in (s["file"] for s in segments):
+            data = read_segment(os.path.join(self.directory, file_name))
+            if self.index["format"] == "binary":
+                for line in BinaryReplayDecoder().decode(data, offset):
+                    if line is not SEGMENT_END:
+                        yield line
+            else:
+                for line in data[offset:].decode().splitlines(keepends=True):
+                    if line != EOF_LINE:
+                        yield json.loads(line)
+            offset = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "replay", help="path the replay was written to, without -index.json"
+    )
+    parser.add_argument("tick", type=int)
+    args = parser.parse_args()
+
+    reader = ReplayReader(args.replay)
+    json.dump(reader.state_at(args.tick), sys.stdout, separators=(",", ":"))
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
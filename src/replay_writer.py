@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import lzma
+import os
+import queue
+import shutil
+import threading
+import zlib
+
+# Suffix added to the name of compressed replay segments, by compression
+COMPRESSION_SUFFIXES = {"zlib": ".zlib", "lzma": ".xz"}
+
+
+def compress(data: bytes, compression: str | None) -> bytes:
+    if compression is None:
+        return data
+    if compression == "zlib":
+        return zlib.compress(data)
+    if compression == "lzma":
+        return lzma.compress(data)
+    raise ValueError(f"Unknown replay compression {compression}")
+
+
+def read_segment(path: str) -> bytes:
+    """Reads a replay segment file, decompressing it if its name says it is compressed."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(COMPRESSION_SUFFIXES["zlib"]):
+        return zlib.decompress(data)
+    if path.endswith(COMPRESSION_SUFFIXES["lzma"]):
+        return lzma.decompress(data)
+    return data
+
+
+def _mirror(path: str, live_path: str):
+    """Makes live_path a copy of path, as a hard link when the file system allows it."""
+    if os.path.exists(live_path) and os.path.samefile(path, live_path):
+        # already linked, and renaming a link over another link to the same file does nothing
+        return
+    temp_path = live_path + ".tmp"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(path, temp_path)
+    except OSError:
+        shutil.copyfile(path, temp_path)
+    os.replace(temp_path, live_path)
+
+
+class ReplayWriter:
+    """
+    Writes replay files on a background thread, so the game loop never waits on the disk.
+    Every file is written once, to a temporary name that is then renamed over it, and the live
+    copy is linked to it, so readers never see a partly written file.
+    Writes happen in the order they are submitted. Call close() to wait for all of them.
+    """
+
+    def __init__(self, background: bool = True):
+        self.background = background
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+
+    def write(
+        self,
+        path: str,
+        live_path: str | None,
+        chunks: list,
+        compression: str | None = None,
+        append: bool = False,
+    ):
+        """
+        Writes the joined chunks (all str or all bytes) to path, compressed if given,
+        or adds them to the end of it with append. live_path is made a copy of path.
+        """
+        self._submit((path, live_path, chunks, compression, append))
+
+    def _submit(self, job: tuple):
+        if self._error is not None:
+            raise self._error
+        if not self.background:
+            self._write(*job)
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="replay-writer", daemon=True
+            )
+            self._thread.start()
+        self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if self._error is None:
+                try:
+                    self._write(*job)
+                except BaseException as e:
+                    self._error = e
+
+    @staticmethod
+    def _write(path, live_path, chunks, compression, append):
+        data = (
+            "".join(chunks).encode()
+            if chunks and isinstance(chunks[0], str)
+            else b"".join(chunks)
+        )
+        if append:
+            with open(path, "ab") as f:
+                f.write(data)
+        else:
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(compress(data, compression))
+            os.replace(temp_path, path)
+        if live_path is not None:
+            _mirror(path, live_path)
+
+    def close(self):
+        """Waits for every submitted write, and raises the first error any of them hit."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,115 @@
+"""
+Regenerates the replay of a game from its input log (see input_log.py) by playing the game again
+with the same map, seed and client messages.
+
+python src/resimulate.py replay/replay-inputs.jsonl regenerated/replay [--check replay/replay]
+
+With --check, the regenerated replay is compared line by line with the original one and the first
+difference is reported. Replays only match when they are written with the same config, and games
+searched with a PATHFINDING.TIME_BUDGET are not deterministic.
+Object ids are counted per process, so only one game can be re-simulated per run.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+from communicator import Communicator
+from input_log import read_input_log
+from main import run
+from replay import ReplayManager
+from replay_reader import ReplayReader
+
+
+class LoggedCommunicator(Communicator):
+    """Plays the client messages of an input log back to the game, and sends nothing."""
+
+    def __init__(self, messages: list[str]):
+        self._messages = iter(messages)
+        super().__init__()
+
+    def get_message(self):
+        try:
+            return json.loads(next(self._messages))
+        except StopIteration:
+            # the log ends where the clients stopped sending, which ended the original game the same way
+            raise EOFError from None
+
+    def post_client_ids(self):
+        pass
+
+    def post_init_world_message(self, message):
+        pass
+
+    def terminate_init_world_sequence(self):
+        pass
+
+    def post_message(self, message, client_id=""):
+        pass
+
+    def terminate_game(self):
+        pass
+
+
+def resimulate(input_log_path: str, output_path: str):
+    """Plays the game in the input log again, writing its replay to output_path."""
+    header, messages = read_input_log(input_log_path)
+    replay = ReplayManager(output_path, None, True)
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, header["map_name"])
+        with open(map_path, "w") as f:
+            f.write("\n".join(header["map"]) + "\n")
+        try:
+            run(
+                replay,
+                map_path,
+                comms=LoggedCommunicator(messages),
+                seed=header["seed"],
+                results_path=f"{output_path}-results.json",
+            )
+        except EOFError:
+            pass
+        finally:
+            replay.close()
+
+
+def first_difference(original_path: str, regenerated_path: str) -> int | None:
+    """The number of the first line (from 0) that differs between two replays, or None if they match."""
+    lines = itertools.zip_longest(
+        ReplayReader(original_path).lines(), ReplayReader(regenerated_path).lines()
+    )
+    for number, (original, regenerated) in enumerate(lines):
+        if original != regenerated:
+            return number
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("input_log")
+    parser.add_argument(
+        "output", help="path to write the replay to, as <path>-N.txt segments"
+    )
+    parser.add_argument(
+        "--check", metavar="REPLAY", help="path of the original replay to compare with"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    resimulate(args.input_log, args.output)
+    if args.check is None:
+        return
+
+    difference = first_difference(args.check, args.output)
+    if difference is not None:
+        print(f"Replays differ from line {difference}")
+        sys.exit(1)
+    print("Replays match")
+
+
+if __name__ == "__main__":
+    main()
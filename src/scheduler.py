@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+from collections.abc import Callable
+
+
+class Event:
+    """A callback scheduled to run at a given tick, and then every `interval` ticks if that is set."""
+
+    def __init__(
+        self,
+        tick: float,
+        callback: Callable[[], object],
+        interval: float | None = None,
+        priority: int = 0,
+    ):
+        self.tick = tick
+        self.callback = callback
+        self.interval = interval
+        self.priority = priority
+        self.cancelled = False
+
+    def cancel(self):
+        """Stops the event, and any repeats of it, from running."""
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Runs timed game events in tick order, so nothing has to be checked on every physics step.
+    Events due at the same tick run in order of priority (lowest first), then in the order they were scheduled.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self._queue: list[tuple[float, int, int, Event]] = []
+        self._sequence = itertools.count()
+
+    def schedule(
+        self,
+        delay: float,
+        callback: Callable[[], object],
+        interval: float | None = None,
+        priority: int = 0,
+    ) -> Event:
+        """Schedules callback to run `delay` ticks from now, and then every `interval` ticks if given."""
+        event = Event(self.tick + delay, callback, interval, priority)
+        self._push(event)
+        return event
+
+    def _push(self, event: Event):
+        heapq.heappush(
+            self._queue, (event.tick, event.priority, next(self._sequence), event)
+        )
+
+    @property
+    def next_tick(self) -> float:
+        """The tick the next event is due at."""
+        return self._queue[0][0] if self._queue else math.inf
+
+    def advance(self, ticks: int = 1):
+        """Moves time forward by `ticks` and runs every event that is due by then."""
+        self.tick += ticks
+        while self._queue and self._queue[0][0] <= self.tick:
+            event = heapq.heappop(self._queue)[3]
+            if event.cancelled:
+                continue
+            if event.interval is not None:
+                event.tick += event.interval
+                self._push(event)
+            event.callback()
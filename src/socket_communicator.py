@@ -0,0 +1,274 @@
+"""
+Serves the clients directly over TCP or a Unix socket, instead of through a coordinator on stdin/stdout,
+when COMMUNICATION.TRANSPORT is "tcp" or "unix".
+
+Clients talk in JSON lines:
+
+- After connecting, a client sends its info, e.g. {"id": "player1", "name": "James"}, within
+  COMMUNICATION.HANDSHAKE_TIMEOUT seconds. The game starts once COMMUNICATION.CLIENTS clients have
+  sent theirs, and is abandoned if they haven't all joined within COMMUNICATION.JOIN_TIMEOUT.
+  Connections made after the game is full, and clients reusing the id of one that joined, are closed.
+- The server sends the client its tank ids, the initial world, "END_INIT", then a world message every
+  communication tick, and "END" once the game is over.
+- The client answers each world message with one line of actions, e.g. {"path": [250, 200]}, within
+  COMMUNICATION.TIMEOUT seconds of it being sent (MAX_TIMEOUT with EARLY_ADVANCE). Late answers are
+  dropped. The server moves on as soon as every client has answered (but not before MIN_TIMEOUT with
+  EARLY_ADVANCE).
+- A client that doesn't read what it is sent within the timeout is dropped.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+
+from communicator import Communicator
+from config import config
+from input_log import InputLog
+from log import log_world_message
+from util import encode_json
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter, info: dict):
+        self.writer = writer
+        self.info = info
+        self.id = info["id"]
+        # Lines received from the client, and None once it has disconnected
+        self.responses: asyncio.Queue[bytes | None] = asyncio.Queue()
+        self.connected = True
+        # Loop time the last world message was sent at, and by which the client has to answer it
+        self.sent_at = 0.0
+        self.deadline = 0.0
+
+
+class SocketCommunicator(Communicator):
+    """
+    A Communicator that talks to each client over its own connection.
+    Messages are sent to the clients concurrently, and every client has its own deadline for answering.
+    Game calls are blocking as with stdin/stdout: each one runs the event loop until it is done.
+    """
+
+    def __init__(self, input_log: InputLog | None = None):
+        if config.COMMUNICATION.CLIENTS != 2:
+            raise ValueError(
+                f"COMMUNICATION.CLIENTS is {config.COMMUNICATION.CLIENTS}, "
+                "but a game is played by 2 clients"
+            )
+        self._loop = asyncio.new_event_loop()
+        self._clients: list[_Client] = []
+        self._all_connected: asyncio.Future = self._loop.create_future()
+        self._server = self._loop.run_until_complete(self._start_server())
+        self._waiting_for_clients = True
+        super().__init__(input_log)
+
+    async def _start_server(self) -> asyncio.AbstractServer:
+        if config.COMMUNICATION.TRANSPORT == "tcp":
+            return await asyncio.start_server(
+                self._handle_client,
+                config.COMMUNICATION.HOST,
+                config.COMMUNICATION.PORT,
+            )
+        if config.COMMUNICATION.TRANSPORT == "unix":
+            path = config.COMMUNICATION.SOCKET_PATH
+            if os.path.exists(path):
+                os.remove(path)
+            return await asyncio.start_unix_server(self._handle_client, path)
+        raise ValueError(f"Unknown transport {config.COMMUNICATION.TRANSPORT}")
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        if self._all_connected.done():
+            writer.close()
+            return
+        try:
+            info = json.loads(
+                await asyncio.wait_for(
+                    reader.readline(), config.COMMUNICATION.HANDSHAKE_TIMEOUT
+                )
+            )
+            info["id"] = str(info["id"])
+        except asyncio.TimeoutError:
+            logging.warning(
+                "Client didn't send its info in time, closing its connection"
+            )
+            writer.close()
+            return
+        except (ValueError, KeyError, TypeError):
+            logging.warning("Client sent invalid info, closing its connection")
+            writer.close()
+            return
+
+        # other clients may have joined while this one was sending its info
+        if len(self._clients) >= config.COMMUNICATION.CLIENTS:
+            logging.warning(
+                f"Client {info['id']} joined a full game, closing its connection"
+            )
+            writer.close()
+            return
+        if any(client.id == info["id"] for client in self._clients):
+            logging.warning(
+                f"Client id {info['id']} is already taken, closing its connection"
+            )
+            writer.close()
+            return
+
+        client = _Client(writer, info)
+        self._clients.append(client)
+        if len(self._clients) == config.COMMUNICATION.CLIENTS:
+            self._all_connected.set_result(None)
+
+        try:
+            while line := await reader.readline():
+                client.responses.put_nowait(line)
+        except ConnectionError:
+            pass
+        client.connected = False
+        client.responses.put_nowait(None)
+
+    def get_message(self):
+        if self._waiting_for_clients:
+            self._waiting_for_clients = False
+            try:
+                self._loop.run_until_complete(
+                    asyncio.wait_for(
+                        asyncio.shield(self._all_connected),
+                        config.COMMUNICATION.JOIN_TIMEOUT,
+                    )
+                )
+            except asyncio.TimeoutError:
+                joined = len(self._clients)
+                self.close()
+                raise TimeoutError(
+                    f"Only {joined} of {config.COMMUNICATION.CLIENTS} clients joined within "
+                    f"{config.COMMUNICATION.JOIN_TIMEOUT} seconds"
+                ) from None
+            message = {"clients": [client.info for client in self._clients]}
+        else:
+            message = self._loop.run_until_complete(self._collect_responses())
+        if self.input_log is not None:
+            self.input_log.record(json.dumps(message, separators=(",", ":")))
+        return message
+
+    async def _collect_responses(self) -> dict:
+        clients = [client for client in self._clients if client.connected]
+        if not clients:
+            # the same as the coordinator closing stdin
+            raise EOFError("Every client has disconnected")
+        responses = await asyncio.gather(*map(self._response, clients))
+        earliest = min(client.sent_at for client in clients) + self.min_timeout
+        if self._loop.time() < earliest:
+            await asyncio.sleep(earliest - self._loop.time())
+        return {
+            client.id: response
+            for client, response in zip(clients, responses)
+            if response is not None
+        }
+
+    async def _response(self, client: _Client) -> dict | None:
+        try:
+            line = await asyncio.wait_for(
+                client.responses.get(), max(client.deadline - self._loop.time(), 0)
+            )
+        except asyncio.TimeoutError:
+            self.missed_responses[client.id] += 1
+            return None
+        if line is None:
+            return None
+        self.response_times[client.id].append(self._loop.time() - client.sent_at)
+        try:
+            return json.loads(line)
+        except ValueError:
+            logging.warning(f"Client {client.id} sent invalid JSON: {line[:100]!r}")
+            return None
+
+    def _send(self, messages: dict[_Client, object], expect_response: bool = False):
+        """Sends each client its message, and waits until they have all been handed to the OS."""
+        self._loop.run_until_complete(self._send_all(messages, expect_response))
+
+    async def _send_all(self, messages: dict[_Client, object], expect_response: bool):
+        # a message sent to several clients is only encoded once
+        encoded: dict[int, bytes] = {}
+        for message in messages.values():
+            if id(message) not in encoded:
+                encoded[id(message)] = encode_json(message).encode() + b"\n"
+        await asyncio.gather(
+            *(
+                self._send_to(client, encoded[id(message)], expect_response)
+                for client, message in messages.items()
+                if client.connected
+            )
+        )
+
+    async def _send_to(self, client: _Client, line: bytes, expect_response: bool):
+        if expect_response:
+            # anything still queued was an answer to an earlier message that came too late
+            while not client.responses.empty():
+                if client.responses.get_nowait() is None:
+                    client.responses.put_nowait(None)
+                    break
+        try:
+            client.writer.write(line)
+            # a client that stops reading would otherwise hold up every tick once its buffer fills
+            await asyncio.wait_for(client.writer.drain(), self.timeout)
+        except ConnectionError:
+            client.connected = False
+            return
+        except asyncio.TimeoutError:
+            logging.warning(f"Client {client.id} stopped reading, dropping it")
+            self._drop(client)
+            return
+        client.sent_at = self._loop.time()
+        client.deadline = client.sent_at + self.timeout
+
+    def _drop(self, client: _Client):
+        client.connected = False
+        client.writer.transport.abort()
+        client.responses.put_nowait(None)
+
+    def _clients_for(self, client_id: str) -> list[_Client]:
+        return [client for client in self._clients if client_id in ("", client.id)]
+
+    def post_client_ids(self):
+        client_ids = self.client_ids()
+        self._send({client: client_ids[client.id] for client in self._clients})
+        logging.info(json.dumps(client_ids, separators=(",", ":")))
+
+    def post_message_with_delay(self, message):
+        self._send({client: message for client in self._clients})
+        logging.info(json.dumps({"": message}, separators=(",", ":")))
+
+    def terminate_init_world_sequence(self):
+        self._send({client: "END_INIT" for client in self._clients})
+        logging.info('"END_INIT"')
+
+    def post_message(self, message, client_id: str = ""):
+        self._send(
+            {client: message for client in self._clients_for(client_id)},
+            expect_response=True,
+        )
+        line = f"{{{json.dumps(client_id)}:{encode_json(message)}}}"
+        log_world_message(line, self.messages_posted)
+        self.messages_posted += 1
+
+    def terminate_game(self):
+        self._send({client: "END" for client in self._clients})
+        logging.info('"END"')
+
+    def close(self):
+        for client in self._clients:
+            client.writer.close()
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.run_until_complete(self._cancel_handlers())
+        self._loop.close()
+
+    @staticmethod
+    async def _cancel_handlers():
+        """Stops the handlers of clients still connected, or still sending their info, which wait to read."""
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
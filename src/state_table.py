@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def round_array(values: np.ndarray) -> np.ndarray:
+    """
+    Rounds to 2 decimals exactly like round(x, 2) does, as info() rounds positions and velocities.
+    np.round can disagree with it on values within floating point error of a half, so those fall back to round().
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(value, 2) for value in values[near_half].tolist()]
+    return rounded
+
+
+class StateTable:
+    """
+    Columnar store of the position, velocity and hp of objects, one row (slot) per object id.
+    Positions and velocities are stored rounded the way info() reports them, so finding the objects
+    that changed since the last update is a single vectorised comparison.
+    """
+
+    def __init__(self):
+        self._slots: dict[str, int] = {}
+        self._free: list[int] = []
+        self.position = np.empty((0, 2))
+        self.velocity = np.empty((0, 2))
+        self.hp = np.empty(0)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, object_id: str) -> int:
+        slot = self._slots.get(object_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._slots[object_id] = self._free.pop()
+        return slot
+
+    def _grow(self):
+        capacity = len(self.hp)
+        new_capacity = max(64, 2 * capacity)
+        extra = new_capacity - capacity
+        # new rows are NaN, which compares unequal to anything, so new objects always count as changed
+        self.position = np.concatenate([self.position, np.full((extra, 2), np.nan)])
+        self.velocity = np.concatenate([self.velocity, np.full((extra, 2), np.nan)])
+        self.hp = np.concatenate([self.hp, np.full(extra, np.nan)])
+        self._free.extend(range(new_capacity - 1, capacity - 1, -1))
+
+    def release(self, object_id: str):
+        """Frees the slot of an object that no longer exists."""
+        slot = self._slots.pop(object_id, None)
+        if slot is not None:
+            self.position[slot] = np.nan
+            self.velocity[slot] = np.nan
+            self.hp[slot] = np.nan
+            self._free.append(slot)
+
+    def update(
+        self,
+        object_ids: list[str],
+        positions: list[tuple[float, float]],
+        velocities: list[tuple[float, float]],
+        hps: list[float],
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stores the state of the given objects.
+        Returns a mask of those whose state changed since the last update, and their rounded positions and velocities.
+        """
+        slots = np.fromiter(
+            map(self._slot, object_ids), dtype=np.intp, count=len(object_ids)
+        )
+        position = round_array(np.array(positions, dtype=float).reshape(-1, 2))
+        velocity = round_array(np.array(velocities, dtype=float).reshape(-1, 2))
+        hp = np.array(hps, dtype=float)
+
+        changed = (
+            (position != self.position[slots]).any(axis=1)
+            | (velocity != self.velocity[slots]).any(axis=1)
+            | (hp != self.hp[slots])
+        )
+
+        self.position[slots] = position
+        self.velocity[slots] = velocity
+        self.hp[slots] = hp
+        return changed, position, velocity
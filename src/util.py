@@ -1,3 +1,4 @@
+import json
 import typing as t
 
 from pymunk.vec2d import Vec2d
@@ -5,3 +6,21 @@ from pymunk.vec2d import Vec2d
 
 def round_vec2d(pos: Vec2d) -> t.List[float]:
     return list(map(lambda x: round(x, 2), pos))
+
+
+class EncodedMessage(dict):
+    """
+    A message carrying its compact JSON encoding, so that it is encoded once however many times it is sent.
+    The encoding isn't updated if the message is changed.
+    """
+
+    def __init__(self, message: dict, encoded: str):
+        super().__init__(message)
+        self.json = encoded
+
+
+def encode_json(message) -> str:
+    """The compact JSON encoding of message, reusing the one an EncodedMessage carries."""
+    if isinstance(message, EncodedMessage):
+        return message.json
+    return json.dumps(message, separators=(",", ":"))
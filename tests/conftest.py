@@ -0,0 +1,112 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from config import config  # noqa: E402
+from gameObjects.game_object import GameObject, IDCounter  # noqa: E402
+from main import run  # noqa: E402
+from replay import ReplayManager  # noqa: E402
+from resimulate import LoggedCommunicator  # noqa: E402
+
+MAP_DIR = os.path.join(ROOT, "maps")
+MAP_FILES = sorted(f for f in os.listdir(MAP_DIR) if f.endswith(".map"))
+
+
+@pytest.fixture(autouse=True)
+def map_cache_dir(tmp_path, monkeypatch):
+    """Keeps compiled maps out of the repository, and every test starting with an empty cache."""
+    cache_dir = str(tmp_path / "map-cache")
+    monkeypatch.setitem(config.MAP, "CACHE_DIR", cache_dir)
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def fresh_ids():
+    """Object ids are counted per process, so games only match when they all count from the start."""
+    IDCounter._tracking.clear()
+    GameObject.pop_dirty()
+
+
+def map_path(map_file: str) -> str:
+    return os.path.join(MAP_DIR, map_file)
+
+
+def client_messages(ticks: int, seed: int = 0) -> list[str]:
+    """
+    The client info, then random actions of both clients for as many ticks. Tanks only move along
+    paths to cells well inside every map, as they would otherwise soon drive into the closing boundary.
+    """
+    rng = random.Random(seed)
+    messages = [
+        json.dumps({"clients": [{"id": "a", "name": "A"}, {"id": "b", "name": "B"}]})
+    ]
+    for _ in range(ticks):
+        actions = {}
+        for client_id in "ab":
+            r = rng.random()
+            if r < 0.3:
+                actions[client_id] = {
+                    "path": [rng.uniform(150, 650), rng.uniform(150, 450)],
+                    "shoot": rng.uniform(0, 360),
+                }
+            elif r < 0.6:
+                actions[client_id] = {"shoot": rng.uniform(0, 360)}
+        messages.append(json.dumps(actions))
+    return messages
+
+
+class RecordingCommunicator(LoggedCommunicator):
+    """Plays client messages back to the game, and keeps every world message it posts."""
+
+    def __init__(self, messages: list[str]):
+        self.posted_init = []
+        self.posted = []
+        super().__init__(messages)
+
+    def post_init_world_message(self, message):
+        self.posted_init.append(message)
+
+    def post_message(self, message, client_id=""):
+        self.posted.append(message)
+
+
+def play_game(
+    replay: ReplayManager,
+    map_file: str = "nuketown.map",
+    ticks: int = 60,
+    seed: int = 0,
+) -> RecordingCommunicator:
+    """
+    Plays a game with random client actions until they run out, writing it to replay.
+    Object ids count from the start, so the same game always gives the same replay.
+    """
+    IDCounter._tracking.clear()
+    comms = RecordingCommunicator(client_messages(ticks, seed))
+    try:
+        run(
+            replay,
+            map_path(map_file),
+            comms=comms,
+            seed=seed,
+            results_path=f"{replay.output_path}-results.json",
+        )
+    except EOFError:
+        pass
+    finally:
+        replay.close()
+    return comms
+
+
+def json_segments(output_path: str) -> list[str]:
+    """The text of every JSON segment of a replay, in order."""
+    segments = []
+    while os.path.isfile(f"{output_path}-{len(segments) + 1}.txt"):
+        with open(f"{output_path}-{len(segments) + 1}.txt") as f:
+            segments.append(f.read())
+    return segments
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from conftest import RecordingCommunicator, json_segments, play_game
+
+from replay import EOF_LINE, ReplayManager, apply_object_updates
+
+
+def replay_states(output_path: str, field_deltas: bool) -> list[dict]:
+    """The state of every object after each tick record of a JSON replay."""
+    states = []
+    objects = {}
+    for segment in json_segments(output_path):
+        for line in segment.splitlines(keepends=True):
+            if line == EOF_LINE:
+                continue
+            message = json.loads(line)
+            if "updated_objects" in message:
+                apply_object_updates(objects, message, field_deltas)
+                states.append(json.loads(json.dumps(objects)))
+    return states
+
+
+def comms_states(comms: RecordingCommunicator, field_deltas: bool) -> list[dict]:
+    """The state of every object after each message sent to the clients."""
+    states = []
+    objects = {}
+    # the init world messages always carry whole objects
+    for message in comms.posted_init:
+        apply_object_updates(objects, json.loads(json.dumps(message)))
+    for message in comms.posted:
+        apply_object_updates(objects, json.loads(json.dumps(message)), field_deltas)
+        states.append(json.loads(json.dumps(objects)))
+    return states
+
+
+@pytest.mark.parametrize("map_file", ["nuketown.map", "caged.map"])
+def test_field_deltas_decode_to_the_full_updates(tmp_path, map_file):
+    full_path, deltas_path = str(tmp_path / "full"), str(tmp_path / "deltas")
+    full = play_game(ReplayManager(full_path, None, True, False, False), map_file)
+    deltas = play_game(ReplayManager(deltas_path, None, True, True, True), map_file)
+
+    with open(f"{deltas_path}-1.txt") as f:
+        assert '{"encoding":"field_deltas"}\n' in f.read()
+    assert len(json_segments(deltas_path)) > 1
+    assert sum(map(len, json_segments(deltas_path))) < sum(
+        map(len, json_segments(full_path))
+    )
+    assert replay_states(deltas_path, True) == replay_states(full_path, False)
+
+    assert len(deltas.posted) == len(full.posted) > 1
+    assert comms_states(deltas, True) == comms_states(full, False)
@@ -0,0 +1,27 @@
+import pymunk
+from conftest import RecordingCommunicator, client_messages, map_path
+
+from game import Game
+from gameObjects import Tank
+from gameObjects.game_object import GameObject
+from map import Map
+from replay import ReplayManager
+
+
+def test_games_do_not_share_dirty_objects(tmp_path):
+    # left marked dirty by an earlier game in the same process
+    stray = Tank(pymunk.Space(), (100, 100))
+    assert stray in GameObject._dirty
+
+    game = Game(
+        pymunk.Space(),
+        Map(map_path("nuketown.map")),
+        ReplayManager(str(tmp_path / "replay"), None, False),
+        comms=RecordingCommunicator(client_messages(0)),
+        seed=0,
+    )
+    assert stray not in GameObject._dirty
+
+    game.game_objects[0].mark_dirty()
+    game.close()
+    assert not GameObject._dirty
@@ -0,0 +1,28 @@
+import logging
+
+import pytest
+
+from config import config
+from log import setup_logging, stop_logging
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_records_are_logged_as_they_were_when_logged(tmp_path, monkeypatch, background):
+    monkeypatch.setitem(config.LOGGING, "BACKGROUND", background)
+    path = tmp_path / "server.log"
+    setup_logging(str(path))
+    try:
+        argv = ["src/main.py", "-m", "nuketown.map", ""]
+        logging.info(argv)
+        logging.info("%s ticks", 3)
+        logging.info("plain")
+        # main.py trims argv right after logging it
+        del argv[-1]
+    finally:
+        stop_logging()
+
+    assert path.read_text().splitlines() == [
+        "INFO:root:['src/main.py', '-m', 'nuketown.map', '']",
+        "INFO:root:3 ticks",
+        "INFO:root:plain",
+    ]
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+from conftest import MAP_FILES, map_path
+
+from map import Map, PathGrid
+
+WALLS_BROKEN = 30
+BOUNDARY_STEPS = 5
+
+
+def is_special(traversability: np.ndarray, y: int, x: int) -> bool:
+    """A traversable cell with two traversable neighbours around a non-traversable diagonal, checked cell by cell."""
+    height, width = traversability.shape
+
+    def traversable(y, x):
+        return 0 <= y < height and 0 <= x < width and traversability[y, x]
+
+    if not traversability[y, x]:
+        return False
+    for dy, dx in ((1, 1), (1, -1), (-1, -1), (-1, 1)):
+        if (
+            traversable(y, x + dx)
+            and traversable(y + dy, x)
+            and 0 <= y + dy < height
+            and 0 <= x + dx < width
+            and not traversability[y + dy, x + dx]
+        ):
+            return True
+    return False
+
+
+def special_points(traversability: np.ndarray) -> set[tuple[int, int]]:
+    return {
+        (y, x)
+        for y, x in np.ndindex(traversability.shape)
+        if is_special(traversability, y, x)
+    }
+
+
+def assert_pathfinding_matches(m: Map):
+    """The incrementally updated pathfinding state is what building it from scratch gives."""
+    expected = special_points(m.traversability)
+    assert m.special_points == expected
+    assert set(map(tuple, np.argwhere(m.special).tolist())) == expected
+    if m.visibility is not None:
+        assert m.visibility.points == expected
+    assert m.grid.walkable == PathGrid(m.traversability).walkable
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_special_points_match_cell_by_cell_check(map_file):
+    assert_pathfinding_matches(Map(map_path(map_file)))
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_pathfinding_follows_broken_walls_and_the_closing_boundary(map_file):
+    m = Map(map_path(map_file))
+    # builds the visibility graph, which is then kept up to date
+    m.path_shortcut((0, 0), (0, 0))
+    assert m.visibility is not None
+    walls = np.argwhere(m.characters == ord("D")).tolist()
+    random.Random(map_file).shuffle(walls)
+
+    for y, x in walls[:WALLS_BROKEN]:
+        m.register_wall_broken(m.to_global_coords(y, x))
+        assert m.traversability[y, x]
+        assert_pathfinding_matches(m)
+    for _ in range(BOUNDARY_STEPS):
+        m.update_traversability_boundary()
+        assert_pathfinding_matches(m)
+    assert not m.traversability[:BOUNDARY_STEPS].any()
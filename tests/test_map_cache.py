@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pymunk
+import pytest
+from conftest import MAP_FILES, map_path
+
+from map import Map
+
+
+def objects(m: Map) -> list[tuple]:
+    return sorted(
+        (type(o).__name__, tuple(o.body.position), o.hp)
+        for o in m.create_game_objects(pymunk.Space())
+    )
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_compiled_map_matches_parsed_map(map_file, map_cache_dir):
+    parsed = Map(map_path(map_file))
+    assert len(os.listdir(map_cache_dir)) == 1
+    compiled = Map(map_path(map_file))
+
+    assert compiled._compiled_path() == parsed._compiled_path()
+    assert (compiled.map_width, compiled.map_height) == (
+        parsed.map_width,
+        parsed.map_height,
+    )
+    assert compiled.extra_config == parsed.extra_config
+    assert np.array_equal(compiled.characters, parsed.characters)
+    assert np.array_equal(compiled.traversability, parsed.traversability)
+    assert np.array_equal(compiled.special, parsed.special)
+    assert compiled.special_points == parsed.special_points
+    assert compiled.fn_objects == parsed.fn_objects
+    assert compiled._distance_fields == parsed._distance_fields
+    assert compiled.grid.walkable == parsed.grid.walkable
+    assert objects(compiled) == objects(parsed)
+
+
+def test_unreadable_compiled_map_is_rebuilt(map_cache_dir):
+    parsed = Map(map_path("nuketown.map"))
+    with open(parsed._compiled_path(), "wb") as f:
+        f.write(b"not a compiled map")
+
+    m = Map(map_path("nuketown.map"))
+    assert np.array_equal(m.traversability, parsed.traversability)
+    assert m._distance_fields == parsed._distance_fields
+    # and the cache was written again
+    assert Map(map_path("nuketown.map"))._load_compiled(parsed._compiled_path())
@@ -0,0 +1,158 @@
+import math
+import random
+
+import numpy as np
+import pytest
+from conftest import MAP_FILES, map_path
+
+from config import config
+from map import DistanceField, Map, VisibilityGraph
+
+pytest.importorskip("pathfinding", reason="installed with requirements/local.txt")
+from pathfinding.core.diagonal_movement import DiagonalMovement  # noqa: E402
+from pathfinding.core.grid import Grid  # noqa: E402
+from pathfinding.finder.a_star import AStarFinder  # noqa: E402
+
+REQUESTS_PER_MAP = 20
+WALLS_BROKEN = 10
+
+
+def path_cost(path) -> float:
+    return sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+
+
+def library_path(m: Map, start, end) -> list[tuple[int, int]]:
+    grid = Grid(matrix=m.traversability)
+    finder = AStarFinder(diagonal_movement=DiagonalMovement.only_when_no_obstacle)
+    path, _ = finder.find_path(
+        grid.node(start[1], start[0]), grid.node(end[1], end[0]), grid
+    )
+    return [(y, x) for x, y in path]
+
+
+def assert_valid(m: Map, path, start, end):
+    """Every step moves to a neighbouring traversable cell, and never cuts a corner."""
+    assert path[0] == start and path[-1] == end
+    for (y0, x0), (y1, x1) in zip(path, path[1:]):
+        assert max(abs(y1 - y0), abs(x1 - x0)) == 1
+        assert m.traversability[y1, x1]
+        if y0 != y1 and x0 != x1:
+            assert m.traversability[y0, x1] and m.traversability[y1, x0]
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_jps_matches_library_a_star(map_file):
+    m = Map(map_path(map_file))
+    rng = random.Random(map_file)
+    cells = list(map(tuple, np.argwhere(m.traversability).tolist()))
+    for _ in range(REQUESTS_PER_MAP):
+        start, end = rng.choice(cells), rng.choice(cells)
+        path, complete = m.grid.find_path(start, end)
+        expected = library_path(m, start, end)
+
+        assert complete
+        if not expected:
+            assert path == []
+            continue
+        assert_valid(m, path, start, end)
+        assert path_cost(path) == pytest.approx(path_cost(expected))
+
+
+def assert_any_angle_paths_match(m: Map, rng: random.Random):
+    """
+    Any-angle paths only cross walkable cells, are never longer than the grid path and are as short
+    as those of a visibility graph built from scratch.
+    """
+    cells = list(map(tuple, np.argwhere(m.traversability).tolist()))
+    for _ in range(REQUESTS_PER_MAP):
+        start, end = rng.choice(cells), rng.choice(cells)
+        path = m.path_shortcut(start, end)
+        expected, _ = m.grid.find_path(start, end)
+
+        assert bool(path) == bool(expected)
+        if not path:
+            continue
+        assert path[0] == start and path[-1] == end
+        for p, q in zip(path, path[1:]):
+            assert m.grid.line_of_sight(m.grid._index(*p), m.grid._index(*q)) == -1
+        assert path_cost(path) <= path_cost(expected) + 1e-9
+        fresh = VisibilityGraph(m.grid, m.special_points).find_path(start, end)
+        assert path_cost(path) == pytest.approx(path_cost(fresh))
+
+    # every edge worked out so far is one a graph built from scratch finds
+    fresh = VisibilityGraph(m.grid, m.special_points)
+    for p, edges in m.visibility._edges.items():
+        assert edges == fresh.neighbours(p)
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_any_angle_paths_follow_broken_walls_and_the_closing_boundary(map_file):
+    m = Map(map_path(map_file))
+    rng = random.Random(map_file)
+    assert m.visibility is None
+    assert_any_angle_paths_match(m, rng)
+
+    walls = np.argwhere(m.characters == ord("D")).tolist()
+    for y, x in rng.sample(walls, min(len(walls), WALLS_BROKEN)):
+        m.register_wall_broken(m.to_global_coords(y, x))
+    assert_any_angle_paths_match(m, rng)
+
+    for _ in range(3):
+        m.update_traversability_boundary()
+    assert_any_angle_paths_match(m, rng)
+
+
+@pytest.mark.parametrize("map_file", MAP_FILES)
+def test_distance_field_matches_search(map_file):
+    m = Map(map_path(map_file))
+    rng = random.Random(map_file)
+    cells = list(map(tuple, np.argwhere(m.traversability).tolist()))
+    end = rng.choice(cells)
+    distances = m.grid.distance_field(end)
+    for _ in range(REQUESTS_PER_MAP):
+        start = rng.choice(cells)
+        path = m.grid.follow_distance_field(distances, start)
+        expected, _ = m.grid.find_path(start, end)
+
+        assert bool(path) == bool(expected)
+        if path:
+            assert_valid(m, path, start, end)
+            assert path_cost(path) == pytest.approx(path_cost(expected))
+
+
+def test_distance_fields_are_built_within_the_node_budget():
+    m = Map(map_path("big.map"))
+    rng = random.Random(0)
+    cells = list(map(tuple, np.argwhere(m.traversability).tolist()))
+    goal = rng.choice(cells)
+    field = DistanceField(m.grid, goal)
+
+    builds = 1
+    while not field.build(node_budget=50):
+        builds += 1
+        for start in rng.sample(cells, 5):
+            if not field.reaches(start):
+                continue
+            path = m.grid.follow_distance_field(field.distances, start)
+            expected, _ = m.grid.find_path(start, goal)
+            assert path_cost(path) == pytest.approx(path_cost(expected))
+
+    # every reachable cell is settled once, and each build settles at most 50
+    reachable = sum(field.distances[m.grid._index(*cell)] < math.inf for cell in cells)
+    assert builds >= reachable / 50
+    assert field.distances == m.grid.distance_field(goal)
+
+
+def test_popular_goals_build_their_distance_field_across_requests(monkeypatch):
+    monkeypatch.setitem(config.PATHFINDING, "NODE_BUDGET", 50)
+    monkeypatch.setitem(config.PATHFINDING, "DISTANCE_FIELD_MIN_REQUESTS", 1)
+    m = Map(map_path("big.map"))
+    rng = random.Random(0)
+    cells = list(map(tuple, np.argwhere(m.traversability).tolist()))
+    goal = rng.choice(cells)
+
+    m.path(rng.choice(cells), goal)
+    assert goal in m._field_builds and goal not in m._distance_fields
+    while goal not in m._distance_fields:
+        m.path(rng.choice(cells), goal)
+    assert goal not in m._field_builds
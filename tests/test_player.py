@@ -0,0 +1,67 @@
+import math
+
+import pymunk
+import pytest
+from conftest import map_path
+
+from config import config
+from gameObjects import Tank
+from map import Map
+from player import Player
+from scheduler import Scheduler
+
+# tanks following a path move at sqrt(2) times TANK.VELOCITY (see Tank.move_to_pos)
+STEP_LENGTH = math.sqrt(2) * config.TANK.VELOCITY * config.SIMULATION.PHYSICS_TIMESTEP
+
+
+def make_player(start: tuple[int, int]) -> tuple[Player, pymunk.Space, Scheduler]:
+    m = Map(map_path("empty.map"))
+    space = pymunk.Space()
+    scheduler = Scheduler()
+    tank = Tank(space, m.to_global_coords(*start))
+    return Player(tank, m, {"id": "a", "name": "a"}, scheduler), space, scheduler
+
+
+def drive(player: Player, space: pymunk.Space, scheduler: Scheduler, steps: int):
+    """Steps the physics like the game does, and returns the position the tank was at on every arrival."""
+    arrivals = []
+    for _ in range(steps):
+        waypoints = len(player.action["path"])
+        space.step(config.SIMULATION.PHYSICS_TIMESTEP)
+        scheduler.advance()
+        if len(player.action["path"]) < waypoints:
+            arrivals.append(tuple(player.gameobject.body.position))
+        if not player.action["path"]:
+            break
+    return arrivals
+
+
+@pytest.mark.parametrize("start, end", [((10, 10), (10, 30)), ((10, 10), (20, 25))])
+def test_tank_stops_on_each_waypoint_when_it_arrives(start, end):
+    player, space, scheduler = make_player(start)
+    target = player.map.to_global_coords(*end)
+    player.register_actions({"path": target})
+    waypoints = list(player.action["path"])
+    assert waypoints and waypoints[-1] == target
+
+    arrivals = drive(player, space, scheduler, 200_000)
+
+    assert len(arrivals) == len(waypoints)
+    for position, waypoint in zip(arrivals, waypoints):
+        assert pymunk.Vec2d(*position).get_distance(waypoint) <= STEP_LENGTH + 1e-9
+    assert player.gameobject.body.velocity == (0, 0)
+
+
+def test_tank_knocked_off_course_heads_for_the_waypoint_again():
+    player, space, scheduler = make_player((10, 10))
+    target = player.map.to_global_coords(10, 30)
+    player.register_actions({"path": target})
+    drive(player, space, scheduler, 1000)
+
+    # a collision pushes the tank sideways, and the game re-plans the disturbed player
+    player.gameobject.body.position += (0, 5)
+    player.follow_path()
+    drive(player, space, scheduler, 200_000)
+
+    assert not player.action["path"]
+    assert player.gameobject.body.position.get_distance(target) <= STEP_LENGTH + 1e-9
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+import pytest
+from conftest import ROOT, json_segments, play_game
+
+from replay import ReplayManager
+from replay_binary import segment_paths
+
+
+def convert(*args: str):
+    subprocess.run(
+        [sys.executable, "src/replay_binary.py", *args], cwd=ROOT, check=True
+    )
+
+
+@pytest.mark.parametrize("map_file", ["nuketown.map", "caged.map", "pacman.map"])
+@pytest.mark.parametrize("field_deltas", [False, True])
+def test_binary_replay_converts_back_to_the_json_replay(
+    tmp_path, map_file, field_deltas
+):
+    json_path, binary_path = str(tmp_path / "json"), str(tmp_path / "binary")
+    play_game(
+        ReplayManager(json_path, None, True, field_deltas, replay_format="json"),
+        map_file,
+    )
+    play_game(
+        ReplayManager(binary_path, None, True, field_deltas, replay_format="binary"),
+        map_file,
+    )
+    assert segment_paths(binary_path)
+
+    converted_path = str(tmp_path / "converted")
+    convert(binary_path, "--segments", converted_path)
+    assert json_segments(converted_path) == json_segments(json_path)
+
+    convert(binary_path, "--output", str(tmp_path / "converted.txt"))
+    with open(tmp_path / "converted.txt") as f:
+        converted_lines = [line for line in f if line != '"EOF"\n']
+    json_lines = [
+        line
+        for segment in json_segments(json_path)
+        for line in segment.splitlines(keepends=True)
+        if line != '"EOF"\n'
+    ]
+    assert converted_lines == json_lines
@@ -0,0 +1,52 @@
+import json
+import math
+
+import pymunk
+import pytest
+from conftest import play_game
+
+from gameObjects import Tank
+from replay import ReplayJSONEncoder, ReplayManager
+from util import EncodedMessage, encode_json
+
+
+class CheckedReplayManager(ReplayManager):
+    """Checks that every spliced replay line is what encoding it in one go gives."""
+
+    spliced_lines = 0
+
+    def write_to_buffer(self, obj):
+        if isinstance(obj, EncodedMessage):
+            self.spliced_lines += 1
+            assert obj.json == json.dumps(
+                obj, cls=ReplayJSONEncoder, separators=(",", ":")
+            )
+        super().write_to_buffer(obj)
+
+
+@pytest.mark.parametrize("map_file", ["nuketown.map", "caged.map", "pacman.map"])
+def test_spliced_output_matches_json_dumps(tmp_path, map_file):
+    replay = CheckedReplayManager(str(tmp_path / "replay"), None, True, False, False)
+    comms = play_game(replay, map_file)
+
+    assert replay.spliced_lines > 0
+    assert comms.posted
+    for message in comms.posted:
+        assert isinstance(message, EncodedMessage)
+        assert encode_json(message) == json.dumps(message, separators=(",", ":"))
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_non_finite_floats_are_encoded_as_json_does(tmp_path, value):
+    space = pymunk.Space()
+    tank = Tank(space, (100, 100))
+    replay = ReplayManager(str(tmp_path / "replay"), None, False, False, False)
+    replay.set_game_info(space)
+    replay.sync_object_updates_in_comms()
+
+    tank.body.velocity = (value, 0)
+    replay.set_game_info(space)
+    message = replay.sync_object_updates_in_comms()
+
+    assert tank.id in message["updated_objects"]
+    assert encode_json(message) == json.dumps(message, separators=(",", ":"))
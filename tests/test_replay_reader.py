@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from conftest import json_segments, play_game
+
+from config import config
+from replay import EOF_LINE, ReplayManager, apply_object_updates
+from replay_binary import SEGMENT_END, read_lines, segment_paths
+from replay_reader import ReplayReader
+
+SNAPSHOT_INTERVAL = 40
+
+
+def written_lines(output_path: str, replay_format: str) -> list[dict]:
+    """Every line of a replay, read straight from its segments."""
+    if replay_format == "binary":
+        return [
+            line
+            for line in read_lines(segment_paths(output_path))
+            if line is not SEGMENT_END
+        ]
+    return [
+        json.loads(line)
+        for segment in json_segments(output_path)
+        for line in segment.splitlines(keepends=True)
+        if line != EOF_LINE
+    ]
+
+
+def normalised(state: dict) -> dict:
+    # positions are tuples in some states and lists in others, and -0.0 == 0.0
+    return json.loads(json.dumps(state, default=list).replace("-0.0", "0.0"))
+
+
+def play(tmp_path, replay_format: str, field_deltas: bool) -> str:
+    output_path = str(tmp_path / "replay")
+    play_game(
+        ReplayManager(
+            output_path, None, True, field_deltas, replay_format=replay_format
+        )
+    )
+    return output_path
+
+
+@pytest.fixture(autouse=True)
+def frequent_snapshots(monkeypatch):
+    monkeypatch.setitem(config.REPLAY, "SNAPSHOT_INTERVAL", SNAPSHOT_INTERVAL)
+
+
+@pytest.mark.parametrize("replay_format", ["json", "binary"])
+@pytest.mark.parametrize("field_deltas", [False, True])
+def test_state_at_matches_reading_from_the_start(tmp_path, replay_format, field_deltas):
+    output_path = play(tmp_path, replay_format, field_deltas)
+    reader = ReplayReader(output_path)
+
+    states = []
+    objects = {}
+    for line in written_lines(output_path, replay_format):
+        if isinstance(line, dict) and "updated_objects" in line:
+            apply_object_updates(objects, line, field_deltas)
+            states.append(
+                normalised(
+                    {"objects": objects, "path_indicators": line["path_indicators"]}
+                )
+            )
+
+    assert reader.ticks == len(states)
+    assert len(reader.snapshots) > 2
+    ticks = set(range(0, reader.ticks, 7))
+    for snapshot in reader.snapshots:
+        ticks |= {snapshot["tick"] - 1, snapshot["tick"], snapshot["tick"] + 1}
+    for tick in sorted(t for t in ticks if 0 <= t < reader.ticks):
+        assert normalised(reader.state_at(tick)) == states[tick], tick
+
+
+@pytest.mark.parametrize("replay_format", ["json", "binary"])
+def test_lines_reads_every_line(tmp_path, replay_format):
+    output_path = play(tmp_path, replay_format, False)
+
+    assert list(ReplayReader(output_path).lines()) == written_lines(
+        output_path, replay_format
+    )
+
+
+def test_ticks_out_of_range_are_rejected(tmp_path):
+    reader = ReplayReader(play(tmp_path, "json", False))
+
+    with pytest.raises(IndexError):
+        reader.state_at(reader.ticks)
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from conftest import play_game
+
+from config import config
+from replay import ReplayManager
+from replay_reader import ReplayReader
+from replay_writer import COMPRESSION_SUFFIXES, read_segment
+
+TICKS = 30
+
+
+def segment_files(directory) -> list[str]:
+    return sorted(
+        name
+        for name in os.listdir(directory)
+        if name.startswith("replay-") and name.split("-")[1][0].isdigit()
+    )
+
+
+@pytest.mark.parametrize(
+    "compression, background",
+    [(None, False), (None, True), ("zlib", True), ("lzma", False)],
+)
+@pytest.mark.parametrize("replay_format", ["json", "binary"])
+def test_written_segments_read_back_as_written(
+    tmp_path, monkeypatch, compression, background, replay_format
+):
+    plain, written, live = tmp_path / "plain", tmp_path / "written", tmp_path / "live"
+    for directory in (plain, written, live):
+        directory.mkdir()
+    play_game(
+        ReplayManager(str(plain / "replay"), None, True, replay_format=replay_format),
+        ticks=TICKS,
+    )
+
+    monkeypatch.setitem(config.REPLAY, "COMPRESSION", compression)
+    monkeypatch.setitem(config.REPLAY, "BACKGROUND_WRITER", background)
+    play_game(
+        ReplayManager(
+            str(written / "replay"),
+            str(live / "replay"),
+            True,
+            replay_format=replay_format,
+        ),
+        ticks=TICKS,
+    )
+
+    suffix = COMPRESSION_SUFFIXES.get(compression, "")
+    plain_segments = segment_files(plain)
+    assert len(plain_segments) > 1
+    assert segment_files(written) == [name + suffix for name in plain_segments]
+    for name in plain_segments:
+        with open(plain / name, "rb") as f:
+            assert read_segment(str(written / (name + suffix))) == f.read()
+        with open(written / (name + suffix), "rb") as a, open(
+            live / (name + suffix), "rb"
+        ) as b:
+            assert a.read() == b.read()
+    assert not [name for name in os.listdir(written) if name.endswith(".tmp")]
+    assert list(ReplayReader(str(written / "replay")).lines()) == list(
+        ReplayReader(str(plain / "replay")).lines()
+    )
@@ -0,0 +1,66 @@
+import builtins
+import json
+
+from conftest import client_messages, map_path
+
+from config import config
+from gameObjects.game_object import IDCounter
+from input_log import InputLog, read_input_log
+from main import run
+from replay import ReplayManager
+from resimulate import first_difference, resimulate
+
+
+def play_logged_game(tmp_path, monkeypatch, seed: int = 0) -> str:
+    """
+    Plays a game through the stdio communicator, recording its input log, and returns the output path
+    of its replay.
+    """
+    monkeypatch.setitem(config.COMMUNICATION, "TRANSPORT", "stdio")
+    monkeypatch.setattr(builtins, "input", iter(client_messages(60, seed)).__next__)
+    output_path = str(tmp_path / "original")
+    replay = ReplayManager(output_path, None, True)
+    input_log = InputLog(f"{output_path}-inputs.jsonl")
+    try:
+        run(
+            replay,
+            map_path("nuketown.map"),
+            seed=seed,
+            input_log=input_log,
+            results_path=f"{output_path}-results.json",
+        )
+    except StopIteration:
+        # the clients ran out of messages
+        pass
+    finally:
+        replay.close()
+        input_log.close()
+    return output_path
+
+
+def test_resimulation_regenerates_the_replay(tmp_path, monkeypatch, capsys):
+    output_path = play_logged_game(tmp_path, monkeypatch)
+    capsys.readouterr()
+    header, messages = read_input_log(f"{output_path}-inputs.jsonl")
+    assert header["seed"] == 0 and json.loads(messages[0])["clients"]
+    assert len(messages) > 1
+
+    IDCounter._tracking.clear()
+    regenerated_path = str(tmp_path / "regenerated")
+    resimulate(f"{output_path}-inputs.jsonl", regenerated_path)
+    assert first_difference(output_path, regenerated_path) is None
+
+
+def test_resimulation_with_another_seed_differs(tmp_path, monkeypatch, capsys):
+    output_path = play_logged_game(tmp_path, monkeypatch)
+    capsys.readouterr()
+    with open(f"{output_path}-inputs.jsonl") as f:
+        header, *lines = f.readlines()
+    with open(f"{output_path}-reseeded.jsonl", "w") as f:
+        f.write(json.dumps({**json.loads(header), "seed": 1}) + "\n")
+        f.writelines(lines)
+
+    IDCounter._tracking.clear()
+    regenerated_path = str(tmp_path / "regenerated")
+    resimulate(f"{output_path}-reseeded.jsonl", regenerated_path)
+    assert first_difference(output_path, regenerated_path) is not None
@@ -0,0 +1,130 @@
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import config
+from socket_communicator import SocketCommunicator
+
+# Every client connection made by a test, closed once it is done
+connections: list[socket.socket] = []
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "server.sock")
+    monkeypatch.setitem(config.COMMUNICATION, "TRANSPORT", "unix")
+    monkeypatch.setitem(config.COMMUNICATION, "SOCKET_PATH", path)
+    yield path
+    for sock in connections:
+        sock.close()
+    connections.clear()
+
+
+def connect(path: str) -> socket.socket:
+    """Connects to the server, waiting for it to start listening."""
+    deadline = time.monotonic() + 5
+    while True:
+        sock = socket.socket(socket.AF_UNIX)
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+            continue
+        sock.settimeout(5)
+        connections.append(sock)
+        return sock
+
+
+def send_info(sock: socket.socket, client_id: str):
+    sock.sendall(json.dumps({"id": client_id, "name": client_id}).encode() + b"\n")
+
+
+def turned_away(sock: socket.socket) -> bool:
+    """Whether the server closed the connection without sending anything, as it does to clients it refuses."""
+    return sock.recv(1024) == b""
+
+
+def start(clients) -> tuple[SocketCommunicator, list[socket.socket]]:
+    """Creates the communicator while clients() connects to it from another thread."""
+    with ThreadPoolExecutor(1) as executor:
+        sockets = executor.submit(clients)
+        communicator = SocketCommunicator()
+        return communicator, sockets.result()
+
+
+def test_clients_joining_a_full_game_are_turned_away(socket_path):
+    def clients():
+        # all three are connected before any of them sends its info
+        sockets = [connect(socket_path) for _ in range(3)]
+        for number, sock in enumerate(sockets):
+            send_info(sock, f"bot{number}")
+        return sockets
+
+    communicator, sockets = start(clients)
+    try:
+        assert len(communicator.client_info) == 2
+        refused = [sock for sock in sockets if turned_away(sock)]
+        assert len(refused) == 1
+        assert {client.id for client in communicator._clients} == {
+            info["id"] for info in communicator.client_info
+        }
+    finally:
+        communicator.close()
+
+
+def test_clients_reusing_an_id_are_turned_away(socket_path):
+    def clients():
+        first, second = connect(socket_path), connect(socket_path)
+        send_info(first, "a")
+        send_info(second, "a")
+        time.sleep(0.2)
+        third = connect(socket_path)
+        send_info(third, "b")
+        return [first, second, third]
+
+    communicator, sockets = start(clients)
+    try:
+        assert sorted(info["id"] for info in communicator.client_info) == ["a", "b"]
+        refused = [turned_away(sock) for sock in sockets]
+        assert refused[:2].count(True) == 1 and not refused[2]
+    finally:
+        communicator.close()
+
+
+def test_clients_that_do_not_send_their_info_are_closed(socket_path, monkeypatch):
+    monkeypatch.setitem(config.COMMUNICATION, "HANDSHAKE_TIMEOUT", 0.2)
+
+    def clients():
+        silent = connect(socket_path)
+        assert turned_away(silent)
+        players = [connect(socket_path), connect(socket_path)]
+        for number, sock in enumerate(players):
+            send_info(sock, f"bot{number}")
+        return players
+
+    communicator, sockets = start(clients)
+    try:
+        assert len(communicator.client_info) == 2
+    finally:
+        communicator.close()
+
+
+def test_game_is_abandoned_when_clients_do_not_join_in_time(socket_path, monkeypatch):
+    monkeypatch.setitem(config.COMMUNICATION, "JOIN_TIMEOUT", 0.3)
+
+    def clients():
+        sock = connect(socket_path)
+        send_info(sock, "bot0")
+        return [sock]
+
+    with ThreadPoolExecutor(1) as executor:
+        sockets = executor.submit(clients)
+        with pytest.raises(TimeoutError, match="Only 1 of 2 clients joined"):
+            SocketCommunicator()
+        assert turned_away(sockets.result()[0])
@@ -0,0 +1,69 @@
+import json
+import random
+
+import numpy as np
+import pytest
+from conftest import json_segments, play_game
+
+from gameObjects.bullet import Bullet
+from gameObjects.tank import Tank
+from replay import ReplayManager
+from state_table import StateTable, round_array
+
+
+def records(output_path: str) -> list[dict]:
+    return [
+        json.loads(line) for line in "".join(json_segments(output_path)).splitlines()
+    ]
+
+
+def test_round_array_rounds_like_round():
+    rng = random.Random(0)
+    values = [rng.uniform(-2000, 2000) for _ in range(10000)]
+    # values within floating point error of a half, where np.round and round() can disagree
+    values += [n / 1000 for n in range(-5005, 5005, 10)] + [1.005, 2.675, 0.125]
+    assert round_array(np.array(values)).tolist() == [round(v, 2) for v in values]
+
+
+def test_state_table_finds_changed_rows():
+    table = StateTable()
+    ids = [f"bullet-{i}" for i in range(100)]
+    positions = [(float(i), 0.0) for i in range(100)]
+    velocities = [(0.0, 1.0)] * 100
+    hps = [1.0] * 100
+
+    changed, _, _ = table.update(ids, positions, velocities, hps)
+    assert changed.all() and len(table) == 100
+    changed, _, _ = table.update(ids, positions, velocities, hps)
+    assert not changed.any()
+
+    positions[3] = (3.001, 0.0)
+    velocities[5] = (0.0, 2.0)
+    hps[7] = 0.0
+    changed, position, _ = table.update(ids, positions, velocities, hps)
+    assert np.flatnonzero(changed).tolist() == [5, 7]
+    assert position[3].tolist() == [3.0, 0.0]
+
+
+def test_released_slots_count_as_changed_when_reused():
+    table = StateTable()
+    table.update(["bullet-1", "bullet-2"], [(1, 1), (2, 2)], [(0, 0), (0, 0)], [1, 1])
+    table.release("bullet-1")
+    assert len(table) == 1
+
+    changed, _, _ = table.update(["bullet-3"], [(1, 1)], [(0, 0)], [1])
+    assert changed.tolist() == [True]
+    assert len(table) == 2 and len(table.hp) == 64
+
+
+@pytest.mark.parametrize("map_file", ["nuketown.map", "bounce.map"])
+def test_columnar_diffing_matches_per_object_diffing(tmp_path, monkeypatch, map_file):
+    columnar_path, per_object_path = str(tmp_path / "columnar"), str(tmp_path / "dicts")
+    columnar = play_game(ReplayManager(columnar_path, None, True), map_file)
+    monkeypatch.setattr(Tank, "columnar_state", False)
+    monkeypatch.setattr(Bullet, "columnar_state", False)
+    per_object = play_game(ReplayManager(per_object_path, None, True), map_file)
+
+    # the tabled objects are recorded after the others, so only the order of keys may differ
+    assert records(columnar_path) == records(per_object_path)
+    assert columnar.posted == per_object.posted